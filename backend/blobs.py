@@ -0,0 +1,165 @@
+"""Content-addressed blob store for revision bodies.
+
+    python blobs.py migrate    # move inline content of existing revisions into blobs
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+
+from compression import ContentCodec
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class BlobStore:
+    """Reference-counted storage of revision bodies keyed by their SHA-256.
+
+    Revisions only keep a `content_hash`; identical contents saved by any
+    number of users share one compressed blob, deleted with its last
+    reference. `indexer(content)` returns extra fields stored with a new
+    blob (its search terms), computed once per unique content.
+    """
+
+    def __init__(self, collection, codec: ContentCodec, indexer: Optional[Callable[[str], dict]] = None):
+        self.collection = collection
+        self.codec = codec
+        self.indexer = indexer
+
+    def _new_blob(self, content: str, revision_type: str) -> dict:
+        data, dict_id = self.codec.compress(content, revision_type)
+        return {
+            "content_z": data,
+            "content_dict": dict_id,
+            "revision_type": revision_type,
+            "size": len(content),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            **(self.indexer(content) if self.indexer else {})
+        }
+
+    async def put(self, content: str, revision_type: str) -> str:
+        digest = content_hash(content)
+        # Most saves of a popular content only need the increment
+        result = await self.collection.update_one({"_id": digest}, {"$inc": {"refs": 1}})
+        if result.matched_count:
+            return digest
+        await self.collection.update_one(
+            {"_id": digest},
+            {"$inc": {"refs": 1}, "$setOnInsert": self._new_blob(content, revision_type)},
+            upsert=True
+        )
+        return digest
+
+    async def release(self, digest: str):
+        blob = await self.collection.find_one_and_update(
+            {"_id": digest},
+            {"$inc": {"refs": -1}},
+            projection={"refs": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if blob is not None and blob["refs"] <= 0:
+            # The refs filter keeps a blob that was re-referenced in between
+            await self.collection.delete_one({"_id": digest, "refs": {"$lte": 0}})
+
+    async def put_many(self, items: List[Tuple[str, str]]) -> List[str]:
+        """put() for many (content, revision_type) pairs in one unordered bulk write.
+
+        Hashing, compression and indexing run in a thread, off the event loop.
+        """
+        digests = await asyncio.to_thread(lambda: [content_hash(content) for content, _ in items])
+        refs = Counter(digests)
+        existing = {blob["_id"] async for blob in self.collection.find({"_id": {"$in": list(refs)}}, {"_id": 1})}
+        # Only bodies not stored yet are compressed and indexed, once each
+        new = {digest: item for digest, item in zip(digests, items) if digest not in existing}
+        blobs = await asyncio.to_thread(
+            lambda: {digest: self._new_blob(content, revision_type) for digest, (content, revision_type) in new.items()}
+        )
+        operations = [
+            UpdateOne({"_id": digest}, {"$inc": {"refs": refs[digest]}, "$setOnInsert": blob}, upsert=True)
+            for digest, blob in blobs.items()
+        ]
+        operations += [UpdateOne({"_id": digest}, {"$inc": {"refs": refs[digest]}}) for digest in existing]
+        if operations:
+            result = await self.collection.bulk_write(operations, ordered=False)
+            if result.matched_count + result.upserted_count < len(operations):
+                # A blob seen above was deleted by its last release in between
+                present = {blob["_id"] async for blob in self.collection.find({"_id": {"$in": list(existing)}}, {"_id": 1})}
+                for digest, (content, revision_type) in zip(digests, items):
+                    if digest in existing and digest not in present:
+                        await self.put(content, revision_type)
+        return digests
+
+    async def release_many(self, digests: Iterable[str]):
+        refs = Counter(digests)
+        if not refs:
+            return
+        await self.collection.bulk_write(
+            [UpdateOne({"_id": digest}, {"$inc": {"refs": -n}}) for digest, n in refs.items()],
+            ordered=False
+        )
+        await self.collection.delete_many({"_id": {"$in": list(refs)}, "refs": {"$lte": 0}})
+
+    async def get_many(self, digests: Iterable[str]) -> Dict[str, str]:
+        blobs = await self.collection.find(
+            {"_id": {"$in": list(set(digests))}}, {"content_z": 1, "content_dict": 1}
+        ).to_list(None)
+        await self.codec.ensure(blob.get("content_dict", 0) for blob in blobs)
+        return {blob["_id"]: self.codec.decompress(blob["content_z"], blob.get("content_dict", 0)) for blob in blobs}
+
+    async def load_content(self, revision: dict) -> dict:
+        """Fill `content` on a stored revision, whatever its storage format."""
+        digest = revision.pop("content_hash", None)
+        if digest is not None:
+            revision["content"] = (await self.get_many([digest]))[digest]
+            return revision
+        await self.codec.ensure([revision.get("content_dict", 0)])
+        return self.codec.decode(revision)
+
+
+async def migrate(db, store: BlobStore):
+    migrated = 0
+    query = {"content_hash": {"$exists": False}}
+    async for revision in db.revisions.find(query, {"_id": 1, "content": 1, "content_z": 1, "content_dict": 1, "revision_type": 1}):
+        content = store.codec.decode(revision)["content"]
+        digest = await store.put(content, revision["revision_type"])
+        result = await db.revisions.update_one(
+            {"_id": revision["_id"], **query},
+            {"$set": {"content_hash": digest}, "$unset": {"content": "", "content_z": "", "content_dict": ""}}
+        )
+        if result.modified_count:
+            migrated += 1
+        else:
+            # Migrated concurrently: drop the extra reference
+            await store.release(digest)
+    print(f"{migrated} revisions moved to blobs")
+
+
+async def main() -> int:
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    db = client[os.environ.get('DB_NAME', 'test_database')]
+    codec = ContentCodec(db.compression_dicts)
+    try:
+        await codec.load()
+        await migrate(db, BlobStore(db.revision_blobs, codec))
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Revision blob store tools")
+    parser.add_argument("command", choices=["migrate"])
+    parser.parse_args()
+    sys.exit(asyncio.run(main()))
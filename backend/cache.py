@@ -0,0 +1,166 @@
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from typing import Any, AsyncIterator, Optional
+
+
+class TTLCache:
+    """In-process LRU cache with a maximum size and per-entry expiry."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._data[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return entry[1] if entry is not None else default
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", prompt)).strip().casefold()
+
+
+def generation_key(
+    subject: str, revision_type: str, prompt: str, image_digest: Optional[str], model: str, template: str = ""
+) -> str:
+    h = hashlib.sha256()
+    for part in (subject, revision_type, normalize_prompt(prompt), image_digest or "", model, template):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def image_digest(image_base64: Optional[str]) -> Optional[str]:
+    if not image_base64:
+        return None
+    return hashlib.sha256(image_base64.encode("ascii", "ignore")).hexdigest()
+
+
+class GenerationCache:
+    """Two-tier cache of generated content: an in-process LRU in front of a
+    Mongo collection whose documents expire through a TTL index."""
+
+    def __init__(self, collection, maxsize: int = 1024, ttl: float = 86400):
+        self.collection = collection
+        self.ttl = ttl
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        await self.collection.create_index("created_at")
+
+    async def get(self, key: str) -> Optional[str]:
+        content = self.memory.get(key)
+        if content is not None:
+            self.hits += 1
+            return content
+        doc = await self.collection.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+            {"content": 1}
+        )
+        if doc is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.memory.set(key, doc["content"])
+        return doc["content"]
+
+    async def set(self, key: str, content: str, meta: Optional[dict] = None):
+        """Store `content`; `meta` (prompt, subject...) is kept alongside for `created_since`."""
+        self.memory.set(key, content)
+        now = datetime.now(timezone.utc)
+        await self.collection.replace_one(
+            {"_id": key},
+            {**(meta or {}), "content": content, "created_at": now, "expires_at": now + timedelta(seconds=self.ttl)},
+            upsert=True
+        )
+
+    async def created_since(self, since: Optional[datetime], limit: int) -> AsyncIterator[dict]:
+        """Live entries stored after `since`, oldest first, without their content."""
+        query = {"expires_at": {"$gt": datetime.now(timezone.utc)}}
+        if since is not None:
+            query["created_at"] = {"$gt": since}
+        cursor = self.collection.find(query, {"content": 0}).sort("created_at", -1).limit(limit)
+        for doc in reversed(await cursor.to_list(length=limit)):
+            yield doc
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_hits": self.memory.hits,
+            "memory_size": len(self.memory),
+        }
+
+
+class RecentStore:
+    """Short-lived documents by id, in memory and in a Mongo TTL collection
+    so that any worker can find what another one stored."""
+
+    def __init__(self, collection, maxsize: int = 4096, ttl: float = 3600):
+        self.collection = collection
+        self.ttl = ttl
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get(self, key: str) -> Optional[dict]:
+        doc = self.memory.get(key)
+        if doc is not None:
+            return doc
+        stored = await self.collection.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+            {"doc": 1}
+        )
+        if stored is None:
+            return None
+        self.memory.set(key, stored["doc"])
+        return stored["doc"]
+
+    async def set(self, key: str, doc: dict):
+        self.memory.set(key, doc)
+        await self.collection.replace_one(
+            {"_id": key},
+            {"doc": doc, "expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.ttl)},
+            upsert=True
+        )
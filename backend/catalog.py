@@ -0,0 +1,122 @@
+"""Static catalog served by the API: subjects, revision types and the
+system prompt of every (subject, revision_type) pair.
+
+Everything is built once at import time. Responses are kept as serialized
+bytes with a strong ETag so handlers never touch JSON encoding.
+"""
+import hashlib
+import json
+from typing import Dict, NamedTuple, Tuple
+
+SUBJECTS = [
+    {"id": "maths", "name": "Mathématiques", "icon": "calculator"},
+    {"id": "francais", "name": "Français", "icon": "book-open"},
+    {"id": "histoire-geo", "name": "Histoire-Géographie", "icon": "globe"},
+    {"id": "emc", "name": "EMC", "icon": "users"},
+    {"id": "svt", "name": "SVT", "icon": "leaf"},
+    {"id": "physique-chimie", "name": "Physique-Chimie", "icon": "flask-conical"},
+    {"id": "anglais", "name": "Anglais", "icon": "languages"},
+    {"id": "espagnol", "name": "Espagnol", "icon": "languages"},
+    {"id": "musique", "name": "Musique", "icon": "music"},
+    {"id": "arts-plastiques", "name": "Arts Plastiques", "icon": "palette"}
+]
+
+REVISION_TYPES = [
+    {"id": "fiche", "name": "Fiche de révision", "description": "Résumé structuré des notions clés"},
+    {"id": "qcm", "name": "QCM", "description": "Questions à choix multiples pour s'entraîner"},
+    {"id": "flashcard", "name": "Flashcards", "description": "Cartes recto-verso pour mémoriser"},
+    {"id": "resume", "name": "Résumé", "description": "Synthèse courte et efficace"},
+    {"id": "trous", "name": "Texte à trous", "description": "Exercice de complétion"}
+]
+
+PROMPT_TEMPLATES = {
+    "fiche": """Tu es un expert pédagogue français spécialisé en {subject} pour les élèves de 3ème.
+Crée une fiche de révision claire et structurée avec:
+- Un titre accrocheur
+- Les notions clés en gras
+- Des définitions simples
+- Des exemples concrets
+- Des astuces pour retenir
+Utilise des emojis pour rendre la fiche attractive. Format en Markdown.""",
+    
+    "qcm": """Tu es un expert pédagogue français spécialisé en {subject} pour les élèves de 3ème.
+Crée un QCM de 10 questions avec:
+- 4 réponses possibles (A, B, C, D)
+- Une seule bonne réponse par question
+- Des explications courtes après chaque réponse
+Pour chaque question, écris les options sous la forme « A) ... », puis « Réponse : X » et « Explication : ... ».
+Format clair et lisible en Markdown.""",
+    
+    "flashcard": """Tu es un expert pédagogue français spécialisé en {subject} pour les élèves de 3ème.
+Crée 10 flashcards de révision avec:
+- RECTO: Question ou terme à définir
+- VERSO: Réponse ou définition
+Sépare chaque flashcard clairement, sous la forme « RECTO : ... » puis « VERSO : ... ».
+Format en Markdown avec --- entre chaque carte.""",
+    
+    "resume": """Tu es un expert pédagogue français spécialisé en {subject} pour les élèves de 3ème.
+Crée un résumé synthétique avec:
+- Les points essentiels à retenir
+- Maximum 500 mots
+- Structure claire avec titres
+- Mots-clés en gras
+Format en Markdown.""",
+    
+    "trous": """Tu es un expert pédagogue français spécialisé en {subject} pour les élèves de 3ème.
+Crée un exercice de texte à trous avec:
+- 10-15 mots manquants (remplacés par _____)
+- Un texte cohérent sur le sujet demandé
+- La liste des mots à placer en désordre
+- Les réponses à la fin, numérotées dans l'ordre des trous
+Format en Markdown."""
+}
+
+CACHE_CONTROL = "public, max-age=3600"
+
+
+class CatalogEntry(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def build_entry(payload: dict) -> CatalogEntry:
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return CatalogEntry(body=body, etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"')
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+SUBJECTS_ENTRY = build_entry({"subjects": SUBJECTS})
+REVISION_TYPES_ENTRY = build_entry({"types": REVISION_TYPES})
+
+SYSTEM_PROMPTS: Dict[Tuple[str, str], str] = {
+    (subject["id"], revision_type): template.format(subject=subject["id"])
+    for subject in SUBJECTS
+    for revision_type, template in PROMPT_TEMPLATES.items()
+}
+
+
+# Part of the generation cache key: editing a template retires the answers it produced
+TEMPLATE_DIGESTS: Dict[str, str] = {
+    revision_type: hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+    for revision_type, template in PROMPT_TEMPLATES.items()
+}
+
+
+def template_digest(revision_type: str) -> str:
+    return TEMPLATE_DIGESTS.get(revision_type, TEMPLATE_DIGESTS["fiche"])
+
+
+def get_system_prompt(subject: str, revision_type: str) -> str:
+    if revision_type not in PROMPT_TEMPLATES:
+        revision_type = "fiche"
+    prompt = SYSTEM_PROMPTS.get((subject, revision_type))
+    if prompt is None:
+        # Subjects outside the catalog are still accepted by the API
+        prompt = PROMPT_TEMPLATES[revision_type].format(subject=subject)
+    return prompt
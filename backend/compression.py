@@ -0,0 +1,178 @@
+"""Transparent zstd compression of revision content.
+
+Each revision_type gets its own trained dictionary: QCMs, flashcards and
+fiches repeat the same headings, emojis and RECTO/VERSO markers, which a
+dictionary captures far better than per-document compression.
+
+Compressed documents (revision blobs, see blobs.py) carry `content_z` and
+`content_dict` (zstd dictionary id, 0 when none) instead of `content`.
+Documents written before compression keep their plain `content`.
+
+    python compression.py train      # train one dictionary per revision_type
+    python compression.py migrate    # compress revisions still stored inline
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import zstandard
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+
+class ContentCodec:
+    """Compresses content with the latest dictionary of its revision_type."""
+
+    def __init__(self, collection, level: int = 9):
+        self.collection = collection
+        self.level = level
+        self._dicts: Dict[int, zstandard.ZstdCompressionDict] = {}
+        self._latest: Dict[str, int] = {}
+        # zstd (de)compressors must not be shared by threads: bulk imports compress off the loop
+        self._local = threading.local()
+
+    async def load(self):
+        async for doc in self.collection.find({}).sort("created_at", 1):
+            self.add_dictionary(doc["_id"], doc["revision_type"], doc["data"])
+
+    async def ensure(self, dict_ids: Iterable[int]):
+        """Fetch dictionaries trained after load(), before decompressing with them.
+
+        Another worker may already compress with a dictionary this one has
+        never seen. Those are only used to decompress here; compression keeps
+        the dictionaries known at load() until the worker restarts.
+        """
+        missing = {dict_id for dict_id in dict_ids if dict_id and dict_id not in self._dicts}
+        if not missing:
+            return
+        async for doc in self.collection.find({"_id": {"$in": list(missing)}}):
+            self._dicts[doc["_id"]] = zstandard.ZstdCompressionDict(doc["data"])
+
+    def add_dictionary(self, dict_id: int, revision_type: str, data: bytes):
+        self._dicts[dict_id] = zstandard.ZstdCompressionDict(data)
+        self._latest[revision_type] = dict_id
+
+    def _cached(self, name: str) -> dict:
+        cache = getattr(self._local, name, None)
+        if cache is None:
+            cache = {}
+            setattr(self._local, name, cache)
+        return cache
+
+    def _compressor(self, dict_id: int) -> zstandard.ZstdCompressor:
+        compressors = self._cached("compressors")
+        compressor = compressors.get(dict_id)
+        if compressor is None:
+            if dict_id:
+                compressor = zstandard.ZstdCompressor(level=self.level, dict_data=self._dicts[dict_id])
+            else:
+                compressor = zstandard.ZstdCompressor(level=self.level)
+            compressors[dict_id] = compressor
+        return compressor
+
+    def _decompressor(self, dict_id: int) -> zstandard.ZstdDecompressor:
+        decompressors = self._cached("decompressors")
+        decompressor = decompressors.get(dict_id)
+        if decompressor is None:
+            if dict_id:
+                decompressor = zstandard.ZstdDecompressor(dict_data=self._dicts[dict_id])
+            else:
+                decompressor = zstandard.ZstdDecompressor()
+            decompressors[dict_id] = decompressor
+        return decompressor
+
+    def compress(self, content: str, revision_type: str) -> Tuple[bytes, int]:
+        dict_id = self._latest.get(revision_type, 0)
+        return self._compressor(dict_id).compress(content.encode('utf-8')), dict_id
+
+    def decompress(self, data: bytes, dict_id: int) -> str:
+        return self._decompressor(dict_id).decompress(data).decode('utf-8')
+
+    def decode(self, doc: dict) -> dict:
+        """Restore `content` on a stored document, in place."""
+        if "content_z" in doc:
+            doc["content"] = self.decompress(doc.pop("content_z"), doc.pop("content_dict", 0))
+        return doc
+
+    async def train(self, revision_type: str, samples: List[str], size: int = 16 * 1024) -> int:
+        trained = zstandard.train_dictionary(size, [sample.encode('utf-8') for sample in samples])
+        dict_id = trained.dict_id()
+        await self.collection.replace_one(
+            {"_id": dict_id},
+            {
+                "revision_type": revision_type,
+                "data": trained.as_bytes(),
+                "samples": len(samples),
+                "created_at": datetime.now(timezone.utc).isoformat()
+            },
+            upsert=True
+        )
+        self.add_dictionary(dict_id, revision_type, trained.as_bytes())
+        return dict_id
+
+
+async def sample_contents(blobs, codec: ContentCodec, revision_type: str, limit: int) -> List[str]:
+    samples = []
+    cursor = blobs.find({"revision_type": revision_type}, {"_id": 0, "content_z": 1, "content_dict": 1})
+    async for doc in cursor.sort("created_at", -1).limit(limit):
+        samples.append(codec.decode(doc)["content"])
+    return samples
+
+
+async def train_all(db, codec: ContentCodec, limit: int, size: int):
+    for revision_type in await db.revision_blobs.distinct("revision_type"):
+        samples = await sample_contents(db.revision_blobs, codec, revision_type, limit)
+        # zstd needs a reasonable corpus; tiny ones produce useless dictionaries
+        if len(samples) < 20:
+            print(f"{revision_type}: {len(samples)} samples, skipped")
+            continue
+        dict_id = await codec.train(revision_type, samples, size)
+        print(f"{revision_type}: dictionary {dict_id} trained on {len(samples)} samples")
+
+
+async def migrate(db, codec: ContentCodec, batch_size: int):
+    migrated = 0
+    operations = []
+    async for doc in db.revisions.find({"content": {"$exists": True}}, {"_id": 1, "content": 1, "revision_type": 1}):
+        data, dict_id = codec.compress(doc["content"], doc["revision_type"])
+        operations.append(UpdateOne(
+            {"_id": doc["_id"], "content": {"$exists": True}},
+            {"$set": {"content_z": data, "content_dict": dict_id}, "$unset": {"content": ""}}
+        ))
+        if len(operations) >= batch_size:
+            migrated += (await db.revisions.bulk_write(operations, ordered=False)).modified_count
+            operations = []
+    if operations:
+        migrated += (await db.revisions.bulk_write(operations, ordered=False)).modified_count
+    print(f"{migrated} revisions compressed")
+
+
+async def main(args) -> int:
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    db = client[os.environ.get('DB_NAME', 'test_database')]
+    codec = ContentCodec(db.compression_dicts)
+    try:
+        await codec.load()
+        if args.command == "train":
+            await train_all(db, codec, args.samples, args.dict_size)
+        else:
+            await migrate(db, codec, args.batch_size)
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Revision content compression tools")
+    parser.add_argument("command", choices=["train", "migrate"])
+    parser.add_argument("--samples", type=int, default=2000, help="documents sampled per revision_type")
+    parser.add_argument("--dict-size", type=int, default=16 * 1024)
+    parser.add_argument("--batch-size", type=int, default=500)
+    sys.exit(asyncio.run(main(parser.parse_args())))
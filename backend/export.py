@@ -0,0 +1,112 @@
+"""Serialization of exported revisions, one chunk at a time.
+
+Exports are streamed: server.py reads a user's revisions batch by batch
+and hands them here, and every returned chunk is written to the response
+before the next batch is read. NDJSON puts one revision per line; the ZIP
+variant holds one Markdown file per revision, with its metadata in a YAML
+front matter. Both carry the keyset cursor of each revision so an
+interrupted download resumes after the last one received.
+"""
+import json
+import re
+import zipfile
+from datetime import datetime
+from typing import Iterable, List, Set
+
+from similarity import fold
+
+# Fields written for each revision, in this order
+EXPORT_FIELDS = ("id", "prompt", "subject", "revision_type", "created_at", "content")
+
+_UNSAFE = re.compile(r"[^a-z0-9]+")
+
+
+def ndjson_chunk(revisions: Iterable[dict]) -> bytes:
+    lines = []
+    for revision in revisions:
+        record = {field: revision.get(field) for field in EXPORT_FIELDS}
+        record["cursor"] = revision["cursor"]
+        lines.append(json.dumps(record, ensure_ascii=False))
+    return "".join(line + "\n" for line in lines).encode('utf-8')
+
+
+def markdown_file(revision: dict) -> str:
+    header = [f"{field}: {json.dumps(revision.get(field), ensure_ascii=False)}" for field in EXPORT_FIELDS[:-1]]
+    header.append(f"cursor: {json.dumps(revision['cursor'])}")
+    return "---\n" + "\n".join(header) + "\n---\n\n" + (revision.get("content") or "")
+
+
+def _slug(text: str, length: int) -> str:
+    return _UNSAFE.sub("-", fold(text or "")).strip("-")[:length].strip("-")
+
+
+def file_name(revision: dict, taken: Set[str]) -> str:
+    """`<subject>/<date>-<prompt slug>.md`, made unique within the archive."""
+    slug = _slug(revision.get("prompt"), 60) or "revision"
+    # Subjects are free text: slugged too, so no "../" or absolute path gets in
+    subject = _slug(revision.get("subject"), 40) or "autre"
+    date = _UNSAFE.sub("-", (revision.get("created_at") or "")[:10])
+    base = f"{subject}/{date}-{slug}"
+    name, n = f"{base}.md", 1
+    while name in taken:
+        n += 1
+        name = f"{base}-{n}.md"
+    taken.add(name)
+    return name
+
+
+class _Sink:
+    """Write-only, unseekable buffer drained by the caller after every write."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class ZipExport:
+    """Incremental ZIP of Markdown files.
+
+    zipfile writes to an unseekable sink with data descriptors, so no entry
+    is ever rewritten and each one can be sent as soon as it is added. Only
+    the central directory (one small record per file) is held until close().
+    """
+
+    def __init__(self):
+        self._sink = _Sink()
+        self._zip = zipfile.ZipFile(self._sink, mode="w", compression=zipfile.ZIP_DEFLATED)
+        self._names: Set[str] = set()
+
+    def add(self, revisions: Iterable[dict]) -> bytes:
+        for revision in revisions:
+            info = zipfile.ZipInfo(file_name(revision, self._names), date_time=_zip_time(revision))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            self._zip.writestr(info, markdown_file(revision))
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        self._zip.close()
+        return self._sink.drain()
+
+
+def _zip_time(revision: dict) -> tuple:
+    try:
+        created = datetime.fromisoformat(revision["created_at"])
+        return max(created.timetuple()[:6], (1980, 1, 1, 0, 0, 0))
+    except (KeyError, TypeError, ValueError):
+        return (1980, 1, 1, 0, 0, 0)
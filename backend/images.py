@@ -0,0 +1,131 @@
+import asyncio
+import base64
+import binascii
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Union
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP", "GIF", "BMP", "TIFF", "MPO"}
+
+# Refuse decompression bombs well before Pillow's own (warning-only) limit
+Image.MAX_IMAGE_PIXELS = 50_000_000
+
+
+class InvalidImage(ValueError):
+    """Raised when the uploaded data is not a supported image."""
+
+
+class ProcessedImage(NamedTuple):
+    data: bytes
+    phash: str
+    width: int
+    height: int
+    bytes_before: int
+    bytes_after: int
+
+    @property
+    def image_base64(self) -> str:
+        return base64.b64encode(self.data).decode('ascii')
+
+
+def perceptual_hash(image: Image.Image) -> str:
+    """64-bit difference hash: stable across rescaling and recompression."""
+    small = image.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:016x}"
+
+
+def preprocess_image(data: Union[bytes, str], max_edge: int = 1600, quality: int = 82) -> ProcessedImage:
+    """Decode, validate, downscale, strip metadata and recompress as JPEG.
+
+    Accepts raw bytes or a base64 string (optionally a data: URL). Runs in a
+    worker process, so everything here may be CPU-heavy.
+    """
+    if isinstance(data, str):
+        if data.startswith("data:"):
+            data = data.partition(",")[2]
+        try:
+            data = base64.b64decode(data, validate=False)
+        except (binascii.Error, ValueError):
+            raise InvalidImage("base64 invalide")
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.format not in ALLOWED_FORMATS:
+            raise InvalidImage(f"format non supporté: {image.format}")
+        image.load()
+    except UnidentifiedImageError:
+        raise InvalidImage("format non reconnu")
+    except (OSError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e))
+
+    # Apply the EXIF orientation before the metadata is dropped
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=quality, optimize=True)
+    processed = out.getvalue()
+    return ProcessedImage(
+        data=processed,
+        phash=perceptual_hash(image),
+        width=image.width,
+        height=image.height,
+        bytes_before=len(data),
+        bytes_after=len(processed),
+    )
+
+
+def _ready() -> bool:
+    # Runs in a worker: importing this module there loads Pillow
+    return True
+
+
+class ImagePipeline:
+    """Runs preprocess_image on a process pool and keeps size metrics."""
+
+    def __init__(self, workers: int = 2, max_edge: int = 1600, quality: int = 82):
+        self.max_edge = max_edge
+        self.quality = quality
+        self.images = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+        self.workers = workers
+        # Forking a server whose Motor and bcrypt threads are running can deadlock the child
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"))
+
+    async def warm_up(self):
+        """Start every worker process now rather than on the first upload."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self._executor, _ready) for _ in range(self.workers)])
+
+    async def process(self, data: Union[bytes, str]) -> ProcessedImage:
+        processed = await asyncio.get_running_loop().run_in_executor(
+            self._executor, preprocess_image, data, self.max_edge, self.quality
+        )
+        self.images += 1
+        self.bytes_before += processed.bytes_before
+        self.bytes_after += processed.bytes_after
+        return processed
+
+    def stats(self) -> dict:
+        return {
+            "images": self.images,
+            "bytes_before": self.bytes_before,
+            "bytes_after": self.bytes_after,
+            "ratio": self.bytes_after / self.bytes_before if self.bytes_before else 0.0,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
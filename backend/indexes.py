@@ -0,0 +1,117 @@
+"""Index definitions for the API collections and a query-plan checker.
+
+Run `python indexes.py --check` to create the indexes and verify that none
+of the queries issued by server.py falls back to a collection scan.
+"""
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+    ],
+    "revisions": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="user_id_created_at_id"),
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("user_id", ASCENDING), ("search_terms", ASCENDING)], name="user_id_search_terms"),
+        IndexModel([("user_id", ASCENDING), ("content_hash", ASCENDING)], name="user_id_content_hash"),
+    ],
+    "revision_blobs": [
+        IndexModel([("search_terms", ASCENDING)], name="search_terms"),
+    ],
+}
+
+# (collection, filter, sort) shapes of every query the API issues
+QUERIES = [
+    ("users", {"email": "check@example.com"}, None),
+    ("users", {"id": "check"}, None),
+    ("revisions", {"user_id": "check"}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("revisions", {"user_id": "check", "$or": [
+        {"created_at": {"$lt": "check"}},
+        {"created_at": "check", "id": {"$lt": "check"}},
+    ]}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("revisions", {"id": "check", "user_id": "check"}, None),
+    ("revisions", {"user_id": "check", "$or": [
+        {"search_terms": {"$in": ["check"]}},
+        {"content_hash": {"$in": ["check"]}},
+    ], "subject": "check"}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("revisions", {"id": {"$in": ["check"]}, "user_id": "check", "deleting": {"$exists": False}}, None),
+    ("revisions", {"id": {"$in": ["check"]}, "deleting": "check"}, None),
+    ("revision_blobs", {"search_terms": {"$in": ["check"]}}, None),
+]
+
+
+async def ensure_indexes(db) -> dict:
+    """Create every collection's indexes; return {collection: error} for those that failed.
+
+    Collections are independent: duplicate emails failing `email_unique`
+    must not keep the revisions indexes from being built.
+    """
+    errors = {}
+    for collection, models in INDEXES.items():
+        try:
+            await db[collection].create_indexes(models)
+        except Exception as e:
+            errors[collection] = str(e)
+    return errors
+
+
+def _stages(plan: dict):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+async def find_collection_scans(db) -> list:
+    """Return the queries whose winning plan contains a COLLSCAN stage."""
+    scans = []
+    for collection, query, sort in QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explained = await cursor.explain()
+        if "COLLSCAN" in _stages(explained["queryPlanner"]["winningPlan"]):
+            scans.append((collection, query, sort))
+    return scans
+
+
+async def main(check: bool) -> int:
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    db = client[os.environ.get('DB_NAME', 'test_database')]
+    try:
+        errors = await ensure_indexes(db)
+        for collection, error in errors.items():
+            print(f"{collection}: {error}")
+        if errors:
+            return 1
+        print("Indexes created")
+        if not check:
+            return 0
+        scans = await find_collection_scans(db)
+        for collection, query, sort in scans:
+            print(f"COLLSCAN: {collection}.find({query}) sort={sort}")
+        if scans:
+            return 1
+        print(f"{len(QUERIES)} queries checked, no collection scan")
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create and verify MongoDB indexes")
+    parser.add_argument("--check", action="store_true", help="fail if any API query plans a COLLSCAN")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.check)))
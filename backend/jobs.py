@@ -0,0 +1,203 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class MemoryJobBackend:
+    """Single-process priority queue; finished jobs are kept for `result_ttl`.
+
+    Queued and running jobs live in a plain dict and never expire; the TTL
+    starts when a job finishes and moves it to the results cache.
+    """
+
+    def __init__(self, max_queued: int = 200, result_ttl: float = 600):
+        self.max_queued = max_queued
+        self._heap = []
+        self._seq = itertools.count()
+        self._pending = {}
+        self._results = TTLCache(maxsize=100_000, ttl=result_ttl)
+        self._available = asyncio.Event()
+
+    async def ensure_indexes(self):
+        pass
+
+    async def submit(self, job: dict):
+        if len(self._heap) >= self.max_queued:
+            raise QueueFull()
+        self._pending[job["id"]] = job
+        heapq.heappush(self._heap, (job["priority"], next(self._seq), job["id"]))
+        self._available.set()
+
+    async def claim(self, timeout: float) -> Optional[dict]:
+        if not self._heap:
+            self._available.clear()
+            try:
+                await asyncio.wait_for(self._available.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        while self._heap:
+            _, _, job_id = heapq.heappop(self._heap)
+            job = self._pending.get(job_id)
+            if job is not None:
+                job["status"] = RUNNING
+                return job
+        return None
+
+    async def finish(self, job_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        job = self._pending.pop(job_id, None)
+        if job is not None:
+            job.update(status=status, result=result, error=error)
+            self._results.set(job_id, job)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        job = self._pending.get(job_id)
+        return job if job is not None else self._results.get(job_id)
+
+    async def depth(self) -> int:
+        return len(self._heap)
+
+
+class MongoJobBackend:
+    """Queue stored in a Mongo collection so several uvicorn workers share it.
+
+    Jobs are claimed atomically with find_one_and_update; a job whose worker
+    died is claimed again once its lease expires.
+    """
+
+    def __init__(self, collection, max_queued: int = 200, result_ttl: float = 600, lease: float = 300):
+        self.collection = collection
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.lease = lease
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("status", ASCENDING), ("priority", ASCENDING), ("created_at", ASCENDING)])
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def submit(self, job: dict):
+        if await self.depth() >= self.max_queued:
+            raise QueueFull()
+        await self.collection.insert_one({"_id": job["id"], **job})
+
+    async def claim(self, timeout: float) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        job = await self.collection.find_one_and_update(
+            {"$or": [{"status": QUEUED}, {"status": RUNNING, "lease_until": {"$lt": now}}]},
+            {"$set": {"status": RUNNING, "lease_until": now + timedelta(seconds=self.lease)}},
+            sort=[("priority", ASCENDING), ("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+        if job is None:
+            await asyncio.sleep(timeout)
+            return None
+        job.pop("_id")
+        return job
+
+    async def finish(self, job_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        await self.collection.update_one(
+            {"_id": job_id},
+            {"$set": {
+                "status": status,
+                "result": result,
+                "error": error,
+                "expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.result_ttl)
+            }}
+        )
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"_id": job_id}, {"_id": 0})
+
+    async def depth(self) -> int:
+        return await self.collection.count_documents({"status": QUEUED})
+
+
+class JobQueue:
+    """Runs queued jobs through `handler` with a fixed number of workers.
+
+    Lower priority values are served first.
+    """
+
+    def __init__(self, backend, handler: Callable[[dict], Awaitable[dict]], workers: int = 4,
+                 poll_interval: float = 1.0):
+        self.backend = backend
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._tasks = []
+
+    async def start(self):
+        await self.backend.ensure_indexes()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, payload: dict, priority: int = 0, user_id: Optional[str] = None) -> dict:
+        job = {
+            "id": str(uuid.uuid4()),
+            "status": QUEUED,
+            "priority": priority,
+            "user_id": user_id,
+            "payload": payload,
+            "created_at": datetime.now(timezone.utc)
+        }
+        await self.backend.submit(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self.backend.get(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[dict]:
+        """Return the job once finished, or its current state after `timeout`."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self.backend.get(job_id)
+            if job is None or job["status"] in (DONE, ERROR) or time.monotonic() >= deadline:
+                return job
+            await asyncio.sleep(min(0.25, deadline - time.monotonic()))
+
+    async def depth(self) -> int:
+        return await self.backend.depth()
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self.backend.claim(self.poll_interval)
+            except Exception as e:
+                logger.error(f"Error claiming job: {e}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if job is None:
+                continue
+            try:
+                result = await self.handler(job)
+                await self.backend.finish(job["id"], DONE, result=result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                detail = getattr(e, "detail", None) or str(e)
+                logger.error(f"Error running job {job['id']}: {detail}")
+                await self.backend.finish(job["id"], ERROR, error=detail)
@@ -0,0 +1,207 @@
+import asyncio
+import time
+import uuid
+from collections import deque
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from emergentintegrations.llm.chat import UserMessage
+
+# emergentintegrations pulls in the provider SDKs and takes seconds to import:
+# it is loaded on first use, or ahead of it by the startup warm-up
+LLM_MODULE = "emergentintegrations.llm.chat"
+
+
+class LlmUnavailable(Exception):
+    """Raised when every attempt failed."""
+
+
+class LlmTimeout(LlmUnavailable):
+    """Raised when no attempt answered before the deadline."""
+
+
+class ModelRoute(NamedTuple):
+    provider: str
+    model: str
+
+    @classmethod
+    def parse(cls, value: str) -> "ModelRoute":
+        provider, _, model = value.strip().partition("/")
+        if not model:
+            raise ValueError(f"expected provider/model, got {value!r}")
+        return cls(provider, model)
+
+    def __str__(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+
+class Completion(NamedTuple):
+    text: str
+    # The route that answered: a fallback or a hedge may win over the primary
+    route: ModelRoute
+
+
+class ModelStats:
+    """Outcome counters and a window of recent latencies for one model."""
+
+    def __init__(self, window: int = 256):
+        self.calls = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.wins = 0
+        self._latencies = deque(maxlen=window)
+
+    def record(self, latency: float):
+        self._latencies.append(latency)
+
+    def snapshot(self) -> dict:
+        ordered = sorted(self._latencies)
+
+        def percentile(pct):
+            return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else None
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "wins": self.wins,
+            "p50_s": percentile(50),
+            "p95_s": percentile(95),
+            "p99_s": percentile(99),
+        }
+
+
+class LlmGateway:
+    """Single entry point for upstream LLM calls.
+
+    Every call gets a deadline. Attempts are made on `routes` in order: the
+    next one starts as soon as the previous fails, or, with `hedge_after`,
+    when it has not answered after that many seconds; the first answer wins
+    and the other attempts are cancelled. With a single route, hedging sends
+    a second request to the same model.
+
+    LlmChat keeps the conversation history of its session, so one is built
+    per attempt; the HTTP connections underneath are pooled by the library.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        routes: List[ModelRoute],
+        timeout: float = 60,
+        hedge_after: Optional[float] = None,
+        concurrency: int = 16,
+        latency=None,
+        errors=None,
+    ):
+        if not routes:
+            raise ValueError("at least one model route is required")
+        self.api_key = api_key
+        self.routes = list(routes)
+        if hedge_after and len(self.routes) == 1:
+            self.routes.append(self.routes[0])
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.latency = latency
+        self.errors = errors
+        # Upper bound on concurrent upstream calls, hedges included
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._stats: Dict[str, ModelStats] = {str(route): ModelStats() for route in self.routes}
+        self.hedges = 0
+        self.fallbacks = 0
+        self.timeouts = 0
+
+    @property
+    def primary(self) -> ModelRoute:
+        return self.routes[0]
+
+    async def _attempt(self, route: ModelRoute, system_message: str, message: "UserMessage", label: str) -> str:
+        from emergentintegrations.llm.chat import LlmChat
+
+        stats = self._stats[str(route)]
+        chat = LlmChat(
+            api_key=self.api_key,
+            session_id=str(uuid.uuid4()),
+            system_message=system_message
+        ).with_model(route.provider, route.model)
+        async with self._semaphore:
+            stats.calls += 1
+            start = time.perf_counter()
+            try:
+                response = await chat.send_message(message)
+            except asyncio.CancelledError:
+                stats.cancelled += 1
+                raise
+            except Exception:
+                stats.errors += 1
+                if self.errors is not None:
+                    self.errors.inc(route.model, label)
+                raise
+            elapsed = time.perf_counter() - start
+        stats.record(elapsed)
+        if self.latency is not None:
+            self.latency.observe(route.model, label, value=elapsed)
+        return response
+
+    async def complete(self, system_message: str, message: "UserMessage", label: str = "") -> Completion:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        attempts: Dict[asyncio.Task, ModelRoute] = {}
+        remaining = iter(self.routes)
+        failures = []
+
+        def launch() -> bool:
+            route = next(remaining, None)
+            if route is None:
+                return False
+            task = asyncio.ensure_future(self._attempt(route, system_message, message, label))
+            attempts[task] = route
+            return True
+
+        launch()
+        next_hedge = loop.time() + self.hedge_after if self.hedge_after else None
+        try:
+            while attempts:
+                now = loop.time()
+                if now >= deadline:
+                    self.timeouts += 1
+                    raise LlmTimeout(f"no answer after {self.timeout:g}s")
+                wait = deadline - now
+                if next_hedge is not None:
+                    wait = min(wait, max(0.0, next_hedge - now))
+                done, _ = await asyncio.wait(attempts, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    route = attempts.pop(task)
+                    if task.exception() is None:
+                        self._stats[str(route)].wins += 1
+                        return Completion(task.result(), route)
+                    failures.append(f"{route}: {task.exception()}")
+                    if launch():
+                        self.fallbacks += 1
+
+                if not done and next_hedge is not None and loop.time() >= next_hedge:
+                    if launch():
+                        self.hedges += 1
+                        next_hedge = loop.time() + self.hedge_after
+                    else:
+                        next_hedge = None
+            raise LlmUnavailable("; ".join(failures))
+        finally:
+            for task in attempts:
+                if task.done():
+                    # Finished in the same round as the winner
+                    task.cancelled() or task.exception()
+                else:
+                    task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "primary": str(self.primary),
+            "timeout_s": self.timeout,
+            "hedge_after_s": self.hedge_after,
+            "hedges": self.hedges,
+            "fallbacks": self.fallbacks,
+            "timeouts": self.timeouts,
+            "models": {name: stats.snapshot() for name, stats in self._stats.items()},
+        }
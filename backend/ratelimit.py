@@ -0,0 +1,185 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone, timedelta
+from typing import Dict, NamedTuple, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+
+class RateLimited(Exception):
+    """Raised when a caller's bucket does not hold enough tokens."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class BucketRule(NamedTuple):
+    rate: float  # tokens refilled per second
+    burst: float  # bucket capacity
+
+
+def refill(tokens: float, updated: float, now: float, rule: BucketRule) -> float:
+    return min(rule.burst, tokens + max(0.0, now - updated) * rule.rate)
+
+
+class MemoryBucketBackend:
+    """Token buckets of a single process, least recently used evicted first.
+
+    An evicted bucket was idle for long enough to be full again in practice.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def ensure_indexes(self):
+        pass
+
+    async def take(self, key: str, cost: float, rule: BucketRule) -> float:
+        now = time.time()
+        tokens, updated = self._buckets.get(key, (rule.burst, now))
+        tokens = refill(tokens, updated, now, rule)
+        if tokens < cost:
+            return (cost - tokens) / rule.rate
+        self._buckets[key] = (tokens - cost, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return 0.0
+
+
+class MongoBucketBackend:
+    """Token buckets in a Mongo collection so every uvicorn worker enforces
+    the same limits.
+
+    Updates are compare-and-set on the previous state; a bucket that is
+    full again is no longer needed and expires through a TTL index.
+    """
+
+    def __init__(self, collection, attempts: int = 5):
+        self.collection = collection
+        self.attempts = attempts
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def take(self, key: str, cost: float, rule: BucketRule) -> float:
+        for _ in range(self.attempts):
+            doc = await self.collection.find_one({"_id": key})
+            now = time.time()
+            if doc is None:
+                tokens = rule.burst
+            else:
+                tokens = refill(doc["tokens"], doc["updated"], now, rule)
+            if tokens < cost:
+                return (cost - tokens) / rule.rate
+            state = {
+                "tokens": tokens - cost,
+                "updated": now,
+                # Full again by then, same as a missing bucket
+                "expires_at": datetime.now(timezone.utc) + timedelta(seconds=(rule.burst - tokens + cost) / rule.rate)
+            }
+            if doc is None:
+                try:
+                    await self.collection.insert_one({"_id": key, **state})
+                    return 0.0
+                except DuplicateKeyError:
+                    continue
+            result = await self.collection.update_one(
+                {"_id": key, "tokens": doc["tokens"], "updated": doc["updated"]},
+                {"$set": state}
+            )
+            if result.matched_count:
+                return 0.0
+        # Heavy contention on one key: that caller is clearly sending enough already
+        return cost / rule.rate
+
+
+class AdmissionControl:
+    """Token-bucket admission, one bucket per caller and scope.
+
+    Routes draw `cost` tokens from the bucket of their scope, so expensive
+    routes exhaust a caller's budget faster than cheap ones.
+    """
+
+    def __init__(self, backend, rules: Dict[str, BucketRule]):
+        self.backend = backend
+        self.rules = rules
+        self.rejected = 0
+
+    async def check(self, key: str, scope: str, cost: float = 1):
+        wait = await self.backend.take(f"{scope}:{key}", cost, self.rules[scope])
+        if wait > 0:
+            self.rejected += 1
+            raise RateLimited(wait)
+
+
+class FairQueue:
+    """Shares `slots` concurrent turns between callers by start-time fair queuing.
+
+    When every slot is busy, a request is tagged with the virtual time at
+    which its caller's previous requests are done being served; the lowest
+    tag runs next. A caller with many queued requests therefore waits behind
+    the single requests of everyone else instead of in front of them.
+
+    Finish tags are kept for the `maxsize` most recent callers: a queue that
+    never goes idle would otherwise keep one per caller ever served. A caller
+    whose tag is evicted simply starts at the current virtual time.
+    """
+
+    def __init__(self, slots: int, maxsize: int = 10_000):
+        self.slots = slots
+        self.maxsize = maxsize
+        self.busy = 0
+        self._virtual = 0.0
+        self._finish: "OrderedDict[str, float]" = OrderedDict()
+        self._heap = []
+        self._seq = itertools.count()
+
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._heap if not future.done())
+
+    @asynccontextmanager
+    async def turn(self, key: str, cost: float = 1):
+        start = max(self._virtual, self._finish.get(key, 0.0))
+        self._finish[key] = start + cost
+        self._finish.move_to_end(key)
+        while len(self._finish) > self.maxsize:
+            self._finish.popitem(last=False)
+        # Freed slots are handed to waiters directly, so a free one means nobody waits
+        if self.busy < self.slots:
+            self.busy += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._heap, (start, next(self._seq), future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                # The slot was handed over just as the caller went away
+                if future.done() and not future.cancelled():
+                    self._release()
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self):
+        while self._heap:
+            start, _, future = heapq.heappop(self._heap)
+            if future.done():
+                continue
+            # The slot passes directly to the next caller
+            self._virtual = start
+            future.set_result(None)
+            return
+        self.busy -= 1
+        if not self.busy:
+            # Idle: past service no longer matters
+            self._virtual = 0.0
+            self._finish.clear()
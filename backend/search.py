@@ -0,0 +1,170 @@
+"""Full-text search over saved revisions.
+
+Revision bodies live in shared compressed blobs, so they cannot carry a
+Mongo text index. Instead the terms are stored next to them: accent-folded,
+stop-word free, lightly stemmed words. Each blob holds the terms of its
+content once (`search_terms`), their frequencies (`search_tf`) and its
+length in terms (`search_len`), however many revisions share it; each
+revision only holds the same three fields for its prompt and subject,
+weighted by TITLE_WEIGHT and marked with `search_v`. A search finds the
+user's blobs and revisions holding any query term, adds up the two sets
+of frequencies and ranks the revisions with BM25; since a user only
+matches their own revisions, the document frequencies come straight from
+the candidates.
+
+    python search.py reindex    # index blobs and revisions saved before this layout
+"""
+import argparse
+import asyncio
+import heapq
+import math
+import os
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from blobs import BlobStore
+from compression import ContentCodec
+from similarity import fold
+
+STOP_WORDS = frozenset("""
+    a ai au aux avec c ce ceci cela ces cet cette d dans de des du elle elles en est et etre eu il ils
+    j je l la le les leur leurs lui m ma mais me mes moi mon n ne ni nos notre nous on ont ou par pas
+    pour qu que qui s sa sans se ses si son sont sur t ta te tes toi ton tu un une vos votre vous y
+""".split())
+
+# Prompt and subject words count as much as this many occurrences in the content
+TITLE_WEIGHT = 5
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def stem(word: str) -> str:
+    # Plural forms are enough for revision topics: "fractions" finds "fraction"
+    if len(word) > 3 and word[-1] in "sx" and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(word) for word in _WORD.findall(fold(text)) if word not in STOP_WORDS and len(word) > 1]
+
+
+def query_terms(query: str) -> List[str]:
+    return list(dict.fromkeys(tokenize(query)))
+
+
+# Revisions indexed with only their prompt and subject terms
+SEARCH_VERSION = 2
+
+
+def _fields(frequencies: Counter) -> dict:
+    return {
+        "search_terms": sorted(frequencies),
+        "search_tf": dict(frequencies),
+        "search_len": sum(frequencies.values()),
+    }
+
+
+def content_fields(content: str) -> dict:
+    """Fields stored once on a blob to make its content searchable."""
+    return _fields(Counter(tokenize(content)))
+
+
+def title_fields(prompt: str, subject: str) -> dict:
+    """Fields stored on a revision to make its prompt and subject searchable."""
+    frequencies = Counter()
+    for term in tokenize(f"{prompt} {subject}"):
+        frequencies[term] += TITLE_WEIGHT
+    return {**_fields(frequencies), "search_v": SEARCH_VERSION}
+
+
+def stats_projection(terms: List[str], base: dict) -> dict:
+    # Only the frequencies of the query terms travel back from Mongo
+    return {**base, "search_len": 1, **{f"search_tf.{term}": 1 for term in terms}}
+
+
+def combine(revision: dict, blob: Optional[dict]) -> dict:
+    """Add a blob's content statistics to those of a revision's title, in place."""
+    if blob is not None and revision.get("search_v") == SEARCH_VERSION:
+        frequencies = Counter(revision.get("search_tf", {}))
+        frequencies.update(blob.get("search_tf", {}))
+        revision["search_tf"] = dict(frequencies)
+        revision["search_len"] = revision.get("search_len", 0) + blob.get("search_len", 0)
+    revision.pop("search_v", None)
+    revision.pop("content_hash", None)
+    return revision
+
+
+def rank(
+    candidates: List[dict], terms: List[str], total: int, top: Optional[int] = None, k1: float = 1.2, b: float = 0.75
+) -> List[Tuple[float, dict]]:
+    """BM25 scores of `candidates` (every revision holding a query term), best
+    first; only the `top` best when given."""
+    if not candidates:
+        return []
+    document_frequency = Counter(term for doc in candidates for term in doc.get("search_tf", {}))
+    idf = {
+        term: math.log(1 + (total - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+        for term in terms
+    }
+    average_length = sum(doc.get("search_len", 0) for doc in candidates) / len(candidates) or 1
+    scored = []
+    for doc in candidates:
+        frequencies: Dict[str, int] = doc.pop("search_tf", {})
+        norm = k1 * (1 - b + b * doc.pop("search_len", 0) / average_length)
+        score = sum(idf[term] * tf * (k1 + 1) / (tf + norm) for term, tf in frequencies.items() if term in idf)
+        scored.append((score, doc))
+    # Newest first among equal scores
+    key = lambda item: (item[0], item[1]["created_at"])  # noqa: E731
+    if top is not None:
+        return heapq.nlargest(top, scored, key=key)
+    return sorted(scored, key=key, reverse=True)
+
+
+async def reindex(db, store: BlobStore) -> int:
+    blobs = 0
+    async for blob in db.revision_blobs.find({"search_len": {"$exists": False}}):
+        await store.codec.ensure([blob.get("content_dict", 0)])
+        content = store.codec.decompress(blob["content_z"], blob.get("content_dict", 0))
+        result = await db.revision_blobs.update_one({"_id": blob["_id"]}, {"$set": content_fields(content)})
+        blobs += result.modified_count
+
+    indexed = 0
+    query = {"search_v": {"$ne": SEARCH_VERSION}}
+    projection = {"_id": 1, "prompt": 1, "subject": 1, "content_hash": 1, "content": 1, "content_z": 1, "content_dict": 1}
+    async for revision in db.revisions.find(query, projection):
+        fields = title_fields(revision["prompt"], revision["subject"])
+        if "content_hash" not in revision:
+            # Still stored inline (see `blobs.py migrate`): keep its content terms on the revision
+            content = (await store.load_content(revision))["content"]
+            fields = _fields(Counter(tokenize(content)) + Counter(fields["search_tf"]))
+        result = await db.revisions.update_one({"_id": revision["_id"], **query}, {"$set": fields})
+        indexed += result.modified_count
+    print(f"{blobs} blobs and {indexed} revisions indexed for search")
+    return indexed
+
+
+async def main() -> int:
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    db = client[os.environ.get('DB_NAME', 'test_database')]
+    codec = ContentCodec(db.compression_dicts)
+    try:
+        await codec.load()
+        await reindex(db, BlobStore(db.revision_blobs, codec, indexer=content_fields))
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Revision search tools")
+    parser.add_argument("command", choices=["reindex"])
+    parser.parse_args()
+    sys.exit(asyncio.run(main()))
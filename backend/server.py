@@ -1,36 +1,245 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Header
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Header, Query, Form, Request
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pydantic import ValidationError
 import os
+import math
+import re
+import json
+import asyncio
+import importlib
 import logging
+import time
 from pathlib import Path
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 import uuid
 from datetime import datetime, timezone
-import bcrypt
 import jwt
 import base64
-from emergentintegrations.llm.chat import LlmChat, UserMessage, ImageContent
+from cache import TTLCache, GenerationCache, RecentStore, generation_key, image_digest
+from singleflight import SingleFlight
+from similarity import SimilarityIndex, SimilarMatch
+from hashing import PasswordHasher, HasherBusy
+from indexes import INDEXES, ensure_indexes
+from images import ImagePipeline, InvalidImage, ProcessedImage
+from compression import ContentCodec
+from blobs import BlobStore
+from search import combine, content_fields, query_terms, rank, stats_projection, title_fields
+from structured import parse_revision, public_view, grade
+from export import ZipExport, ndjson_chunk
+from metrics import Registry, MetricsMiddleware, MongoCommandMetrics
+from catalog import (
+    CACHE_CONTROL, REVISION_TYPES_ENTRY, SUBJECTS_ENTRY, CatalogEntry, etag_matches, get_system_prompt, template_digest
+)
+from ratelimit import (
+    AdmissionControl, BucketRule, FairQueue, MemoryBucketBackend, MongoBucketBackend, RateLimited
+)
+from llm import LLM_MODULE, LlmGateway, LlmTimeout, LlmUnavailable, ModelRoute
+from uploads import BodyLimitMiddleware
+from jobs import JobQueue, MemoryJobBackend, MongoJobBackend, QueueFull
+
+if TYPE_CHECKING:
+    from emergentintegrations.llm.chat import UserMessage
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Metrics
+metrics = Registry()
+http_latency = metrics.histogram(
+    "goya_http_request_duration_seconds", "HTTP request latency by route", ["method", "route", "status"]
+)
+http_in_flight = metrics.gauge("goya_http_requests_in_flight", "HTTP requests being served")
+llm_latency = metrics.histogram(
+    "goya_llm_request_duration_seconds", "Successful LLM attempt latency", ["model", "revision_type"]
+)
+llm_errors = metrics.counter("goya_llm_request_errors_total", "Failed LLM attempts", ["model", "revision_type"])
+admission_rejections = metrics.counter("goya_admission_rejected_total", "Requests refused by rate limiting", ["route"])
+bcrypt_latency = metrics.histogram(
+    "goya_bcrypt_duration_seconds", "Password hashing time, queueing included", ["operation"]
+)
+mongo_latency = metrics.histogram(
+    "goya_mongo_command_duration_seconds", "MongoDB command latency", ["command", "collection"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+)
+mongo_errors = metrics.counter("goya_mongo_command_errors_total", "Failed MongoDB commands", ["command", "collection"])
+
 # MongoDB connection
 mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-client = AsyncIOMotorClient(mongo_url)
+# Connections are opened in the background; the lifespan warm-up waits for the first one
+client = AsyncIOMotorClient(
+    mongo_url,
+    minPoolSize=int(os.environ.get('MONGO_MIN_POOL_SIZE', '5')),
+    event_listeners=[MongoCommandMetrics(mongo_latency, mongo_errors)]
+)
 db = client[os.environ.get('DB_NAME', 'test_database')]
 
 # JWT Config
 JWT_SECRET = os.environ.get('JWT_SECRET', 'default-secret-key')
 JWT_ALGORITHM = "HS256"
 
+# User projections of verified tokens, keyed by user id
+user_cache = TTLCache(
+    maxsize=int(os.environ.get('USER_CACHE_SIZE', '4096')),
+    ttl=float(os.environ.get('USER_CACHE_TTL', '60'))
+)
+
+# Password hashing Config
+password_hasher = PasswordHasher(
+    rounds=int(os.environ.get('BCRYPT_ROUNDS', '12')),
+    workers=int(os.environ.get('BCRYPT_WORKERS', '4')),
+    max_pending=int(os.environ.get('BCRYPT_MAX_PENDING', '64'))
+)
+
 # LLM Config
 EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY', '')
+LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'openai')
+LLM_MODEL = os.environ.get('LLM_MODEL', 'gpt-5.2')
+STREAM_HEARTBEAT_INTERVAL = float(os.environ.get('STREAM_HEARTBEAT_INTERVAL', '5'))
+# Comma-separated provider/model list tried after the primary one, e.g. "openai/gpt-5-mini"
+LLM_CONCURRENCY = int(os.environ.get('LLM_CONCURRENCY', '16'))
+LLM_FALLBACK_MODELS = [m for m in os.environ.get('LLM_FALLBACK_MODELS', '').split(',') if m.strip()]
+llm_gateway = LlmGateway(
+    EMERGENT_LLM_KEY,
+    [ModelRoute(LLM_PROVIDER, LLM_MODEL)] + [ModelRoute.parse(m) for m in LLM_FALLBACK_MODELS],
+    timeout=float(os.environ.get('LLM_TIMEOUT', '90')),
+    # Seconds without an answer before the next model is also asked; 0 disables hedging
+    hedge_after=float(os.environ.get('LLM_HEDGE_AFTER', '0')) or None,
+    # Upper bound on concurrent upstream LLM calls, shared by every endpoint
+    concurrency=LLM_CONCURRENCY,
+    latency=llm_latency,
+    errors=llm_errors
+)
+
+# Generation cache Config
+generation_cache = GenerationCache(
+    db.generation_cache,
+    maxsize=int(os.environ.get('GENERATION_CACHE_SIZE', '1024')),
+    ttl=float(os.environ.get('GENERATION_CACHE_TTL', '86400'))
+)
+generation_flight = SingleFlight()
+# Near-duplicate prompts (accents, word order, stop words) reuse an earlier generation
+similar_prompts = SimilarityIndex(
+    threshold=float(os.environ.get('SIMILAR_PROMPT_THRESHOLD', '0.8')),
+    maxsize=int(os.environ.get('SIMILAR_PROMPT_INDEX_SIZE', '50000'))
+)
+SIMILAR_PROMPT_REFRESH_INTERVAL = float(os.environ.get('SIMILAR_PROMPT_REFRESH_INTERVAL', '60'))
+recent_generations = RecentStore(
+    db.recent_generations,
+    ttl=float(os.environ.get('GENERATION_RESULT_TTL', '3600'))
+)
+
+MAX_BATCH_ITEMS = int(os.environ.get('MAX_BATCH_ITEMS', '10'))
+# Revisions read from Mongo, and blobs fetched, per step of an export
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '100'))
+# Revisions ranked per search, newest first when more match
+SEARCH_MAX_CANDIDATES = int(os.environ.get('SEARCH_MAX_CANDIDATES', '1000'))
+# Blobs holding a query term looked up per search, across all users
+SEARCH_MAX_BLOBS = int(os.environ.get('SEARCH_MAX_BLOBS', '5000'))
+# Bulk import/delete: items per request, and per Mongo write
+MAX_BULK_ITEMS = int(os.environ.get('MAX_BULK_ITEMS', '1000'))
+BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', '100'))
+
+# Image preprocessing Config
+image_pipeline = ImagePipeline(
+    workers=int(os.environ.get('IMAGE_WORKERS', '2')),
+    max_edge=int(os.environ.get('IMAGE_MAX_EDGE', '1600')),
+    quality=int(os.environ.get('IMAGE_JPEG_QUALITY', '82'))
+)
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', str(15 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# ============== LIFESPAN ==============
+
+async def create_indexes():
+    app.state.index_errors = await ensure_indexes(db)
+    for collection, error in app.state.index_errors.items():
+        # Duplicate emails in existing data make the unique index fail
+        logger.error(f"Error creating {collection} indexes: {error}")
+    await generation_cache.ensure_indexes()
+    await recent_generations.ensure_indexes()
+    await admission_backend.ensure_indexes()
+
+async def ping_mongo(timeout: float = 2) -> bool:
+    try:
+        await asyncio.wait_for(client.admin.command("ping"), timeout)
+        return True
+    except Exception:
+        return False
+
+async def warm_up_step(name: str, step):
+    started = time.perf_counter()
+    try:
+        await step
+        app.state.warm_up[name] = round(time.perf_counter() - started, 3)
+    except Exception as e:
+        logger.error(f"Warm-up step {name} failed: {e}")
+        app.state.warm_up[name] = f"error: {e}"
+
+async def prepare_database(retry_max: float = 30):
+    """Index creation, dictionaries and job workers, retried until MongoDB answers.
+
+    Every step can run again after a partial failure. The process keeps
+    serving the liveness probe meanwhile; readiness waits for this.
+    """
+    delay = 1.0
+    while True:
+        try:
+            await create_indexes()
+            await content_codec.load()
+            await job_queue.start()
+            return
+        except Exception as e:
+            logger.error(f"Database startup failed, retrying in {delay:g}s: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, retry_max)
+
+async def warm_up():
+    """One-time costs paid before the readiness probe lets traffic in."""
+    started = time.perf_counter()
+    synced_at = None
+    await warm_up_step("database", prepare_database())
+
+    async def load_similar_prompts():
+        nonlocal synced_at
+        synced_at = await refresh_similar_prompts(None)
+
+    await asyncio.gather(
+        warm_up_step("llm_import", asyncio.to_thread(importlib.import_module, LLM_MODULE)),
+        warm_up_step("image_workers", image_pipeline.warm_up()),
+        warm_up_step("similar_prompts", load_similar_prompts()),
+    )
+    app.state.background.append(asyncio.create_task(sync_similar_prompts(synced_at)))
+    app.state.ready = True
+    logger.info(f"Warm-up done in {time.perf_counter() - started:.2f}s: {app.state.warm_up}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    app.state.warm_up = {}
+    # Until create_indexes runs, no unique index can be relied on
+    app.state.index_errors = dict.fromkeys(INDEXES, "pending")
+    app.state.background = []
+    # Nothing here waits for MongoDB: the app starts and answers liveness without it
+    app.state.background.append(asyncio.create_task(warm_up()))
+    try:
+        yield
+    finally:
+        for task in app.state.background:
+            task.cancel()
+        await job_queue.stop()
+        client.close()
+        password_hasher.shutdown()
+        image_pipeline.shutdown()
 
 # Create the main app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 api_router = APIRouter(prefix="/api")
 
 # Configure logging
@@ -40,6 +249,51 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Revision content compression Config
+content_codec = ContentCodec(db.compression_dicts, level=int(os.environ.get('CONTENT_ZSTD_LEVEL', '9')))
+blob_store = BlobStore(db.revision_blobs, content_codec, indexer=content_fields)
+
+# Generation job queue Config
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '4'))
+JOB_MAX_QUEUED = int(os.environ.get('JOB_MAX_QUEUED', '200'))
+JOB_RETRY_AFTER = int(os.environ.get('JOB_RETRY_AFTER', '10'))
+if os.environ.get('JOB_BACKEND', 'memory') == 'mongo':
+    job_backend = MongoJobBackend(db.jobs, max_queued=JOB_MAX_QUEUED)
+else:
+    job_backend = MemoryJobBackend(max_queued=JOB_MAX_QUEUED)
+
+# Admission control Config: token buckets per user id, or per IP when anonymous
+ADMISSION_RULES = {
+    "llm": BucketRule(
+        rate=float(os.environ.get('LLM_RATE_PER_MINUTE', '10')) / 60,
+        burst=float(os.environ.get('LLM_BURST', '20'))
+    ),
+    "auth": BucketRule(
+        rate=float(os.environ.get('AUTH_RATE_PER_MINUTE', '10')) / 60,
+        burst=float(os.environ.get('AUTH_BURST', '10'))
+    ),
+}
+# route -> (bucket scope, tokens drawn per call)
+ROUTE_COSTS = {
+    "generate": ("llm", 1),
+    "generate_upload": ("llm", 2),
+    "generate_batch": ("llm", 1),  # per item
+    "generate_job": ("llm", 1),
+    "register": ("auth", 2),
+    "login": ("auth", 1),
+    "reset_password": ("auth", 2),
+}
+if os.environ.get('ADMISSION_BACKEND', 'memory') == 'mongo':
+    admission_backend = MongoBucketBackend(db.rate_limits)
+else:
+    admission_backend = MemoryBucketBackend()
+admission = AdmissionControl(admission_backend, ADMISSION_RULES)
+# Reverse proxies in front of the API, each appending to X-Forwarded-For
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', '1'))
+# Upstream LLM capacity is shared fairly between callers rather than first come first served
+llm_queue = FairQueue(LLM_CONCURRENCY)
+llm_client: ContextVar[str] = ContextVar("llm_client", default="anonymous")
+
 # ============== MODELS ==============
 
 class UserCreate(BaseModel):
@@ -67,6 +321,15 @@ class RevisionRequest(BaseModel):
     subject: str
     revision_type: str
     image_base64: Optional[str] = None
+    # False asks for a fresh generation even if a similar prompt was answered before
+    allow_similar: bool = True
+
+class BatchRevisionRequest(BaseModel):
+    prompt: str
+    subject: str
+    revision_types: List[str] = Field(min_length=1)
+    subjects: Optional[List[str]] = None
+    image_base64: Optional[str] = None
 
 class ResetPasswordRequest(BaseModel):
     email: EmailStr
@@ -81,6 +344,37 @@ class RevisionResponse(BaseModel):
     revision_type: str
     content: str
     created_at: str
+    # Set when the content was generated for another, similar prompt
+    similar_prompt: Optional[str] = None
+    similarity: Optional[float] = None
+
+class RevisionSummary(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    user_id: Optional[str] = None
+    prompt: str
+    subject: str
+    revision_type: str
+    created_at: str
+
+class RevisionPage(BaseModel):
+    items: List[RevisionSummary]
+    next_cursor: Optional[str] = None
+
+class SearchResult(RevisionSummary):
+    score: float
+
+class SearchPage(BaseModel):
+    items: List[SearchResult]
+    total: int
+    # The lookup stopped at SEARCH_MAX_BLOBS/SEARCH_MAX_CANDIDATES: more revisions may match
+    total_capped: bool = False
+    next_cursor: Optional[str] = None
+
+# List pages never load the Markdown body
+SUMMARY_PROJECTION = {"_id": 0, "id": 1, "user_id": 1, "prompt": 1, "subject": 1, "revision_type": 1, "created_at": 1}
+# A single revision, without the fields kept for quizzes and search
+REVISION_PROJECTION = {"_id": 0, "structured": 0, "search_terms": 0, "search_tf": 0, "search_len": 0, "search_v": 0}
 
 class SaveRevisionRequest(BaseModel):
     prompt: str
@@ -88,17 +382,48 @@ class SaveRevisionRequest(BaseModel):
     revision_type: str
     content: str
 
+class BulkRevisionItem(SaveRevisionRequest):
+    # Kept when restoring an export, so the listing order survives
+    created_at: Optional[datetime] = None
+
+class BulkImportRequest(BaseModel):
+    # Validated item by item, so one bad revision does not reject the others
+    revisions: List[Any] = Field(..., max_length=MAX_BULK_ITEMS)
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkImportResponse(BaseModel):
+    created: int
+    results: List[BulkItemResult]
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[str] = Field(..., max_length=MAX_BULK_ITEMS)
+
+class BulkDeleteResponse(BaseModel):
+    deleted: int
+    not_found: List[str]
+
+class QuizAnswers(BaseModel):
+    # Question (or gap) index -> chosen letter (or word)
+    answers: Dict[int, str]
+
 # ============== AUTH HELPERS ==============
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+async def hash_password(password: str) -> str:
+    with bcrypt_latency.time("hash"):
+        return await password_hasher.hash(password)
 
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+async def verify_password(password: str, hashed: str) -> bool:
+    with bcrypt_latency.time("verify"):
+        return await password_hasher.verify(password, hashed)
 
-def create_token(user_id: str) -> str:
+def create_token(user_id: str, token_version: int = 0) -> str:
     payload = {
         "user_id": user_id,
+        "tv": token_version,
         "exp": datetime.now(timezone.utc).timestamp() + 86400 * 7  # 7 days
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
@@ -109,28 +434,67 @@ async def get_current_user(authorization: str = None):
     try:
         token = authorization.replace("Bearer ", "")
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user = await db.users.find_one({"id": payload["user_id"]}, {"_id": 0})
+        version = payload.get("tv", 0)
+        
+        user = user_cache.get(payload["user_id"])
+        # A newer token than the cached copy means the password changed on another worker
+        if user is None or user.get("token_version", 0) < version:
+            user = await db.users.find_one({"id": payload["user_id"]}, {"_id": 0, "password": 0})
+            if not user:
+                return None
+            user_cache.set(user["id"], user)
+        # Tokens issued before the last password reset carry an older version
+        if user.get("token_version", 0) != version:
+            return None
         return user
     except:
         return None
 
+# ============== ADMISSION CONTROL ==============
+
+def client_ip(http_request: Request) -> str:
+    forwarded = [part.strip() for part in http_request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+    # Only the entries appended by our own proxies can be trusted
+    if TRUSTED_PROXY_HOPS and len(forwarded) >= TRUSTED_PROXY_HOPS:
+        return forwarded[-TRUSTED_PROXY_HOPS]
+    return http_request.client.host if http_request.client else "unknown"
+
+async def admit(http_request: Request, user: Optional[dict], route: str, count: int = 1):
+    scope, cost = ROUTE_COSTS[route]
+    key = f"user:{user['id']}" if user else f"ip:{client_ip(http_request)}"
+    try:
+        await admission.check(key, scope, cost * count)
+    except RateLimited as e:
+        admission_rejections.inc(route)
+        raise HTTPException(
+            status_code=429,
+            detail="Trop de demandes, réessayez dans un instant",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
+    # LLM calls made for this request queue under the same caller
+    llm_client.set(key)
+
 # ============== AUTH ROUTES ==============
 
 @api_router.post("/auth/register", response_model=TokenResponse)
-async def register(user_data: UserCreate):
-    existing = await db.users.find_one({"email": user_data.email})
-    if existing:
+async def register(user_data: UserCreate, http_request: Request):
+    await admit(http_request, None, "register")
+    # The unique index is the guard; without it (older duplicates keep it from
+    # being built) the email has to be looked up first
+    if "users" in app.state.index_errors and await db.users.find_one({"email": user_data.email}, {"_id": 1}):
         raise HTTPException(status_code=400, detail="Email déjà utilisé")
-    
     user_id = str(uuid.uuid4())
     user = {
         "id": user_id,
         "email": user_data.email,
         "name": user_data.name,
-        "password": hash_password(user_data.password),
+        "password": await hash_password(user_data.password),
         "created_at": datetime.now(timezone.utc).isoformat()
     }
-    await db.users.insert_one(user)
+    try:
+        await db.users.insert_one(user)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email déjà utilisé")
     
     token = create_token(user_id)
     return TokenResponse(
@@ -139,12 +503,13 @@ async def register(user_data: UserCreate):
     )
 
 @api_router.post("/auth/login", response_model=TokenResponse)
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, http_request: Request):
+    await admit(http_request, None, "login")
     user = await db.users.find_one({"email": credentials.email}, {"_id": 0})
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user or not await verify_password(credentials.password, user["password"]):
         raise HTTPException(status_code=401, detail="Email ou mot de passe incorrect")
     
-    token = create_token(user["id"])
+    token = create_token(user["id"], user.get("token_version", 0))
     return TokenResponse(
         token=token,
         user=UserResponse(id=user["id"], email=user["email"], name=user["name"], created_at=user["created_at"])
@@ -158,126 +523,457 @@ async def get_me(authorization: str = Header(None)):
     return UserResponse(id=user["id"], email=user["email"], name=user["name"], created_at=user["created_at"])
 
 @api_router.post("/auth/reset-password")
-async def reset_password(request: ResetPasswordRequest):
+async def reset_password(request: ResetPasswordRequest, http_request: Request):
+    await admit(http_request, None, "reset_password")
     user = await db.users.find_one({"email": request.email})
     if not user:
         raise HTTPException(status_code=404, detail="Aucun compte trouvé avec cet email")
     
-    new_hashed = hash_password(request.new_password)
+    new_hashed = await hash_password(request.new_password)
+    # Bumping the version invalidates every token (and cached session) issued so far
     await db.users.update_one(
         {"email": request.email},
-        {"$set": {"password": new_hashed}}
+        {"$set": {"password": new_hashed}, "$inc": {"token_version": 1}}
     )
+    # Only this process's cache: other workers keep accepting older tokens until
+    # their cached copy expires (USER_CACHE_TTL), or a newer token reloads it
+    user_cache.pop(user["id"])
     return {"message": "Mot de passe mis à jour avec succès"}
 
 # ============== LLM GENERATION ==============
 
-def get_system_prompt(subject: str, revision_type: str) -> str:
-    prompts = {
-        "fiche": f"""Tu es un expert pédagogue français spécialisé en {subject} pour les élèves de 3ème.
-Crée une fiche de révision claire et structurée avec:
-- Un titre accrocheur
-- Les notions clés en gras
-- Des définitions simples
-- Des exemples concrets
-- Des astuces pour retenir
-Utilise des emojis pour rendre la fiche attractive. Format en Markdown.""",
-        
-        "qcm": f"""Tu es un expert pédagogue français spécialisé en {subject} pour les élèves de 3ème.
-Crée un QCM de 10 questions avec:
-- 4 réponses possibles (A, B, C, D)
-- Une seule bonne réponse par question
-- Des explications courtes après chaque réponse
-À la fin, donne les réponses correctes.
-Format clair et lisible en Markdown.""",
-        
-        "flashcard": f"""Tu es un expert pédagogue français spécialisé en {subject} pour les élèves de 3ème.
-Crée 10 flashcards de révision avec:
-- RECTO: Question ou terme à définir
-- VERSO: Réponse ou définition
-Sépare chaque flashcard clairement.
-Format en Markdown avec --- entre chaque carte.""",
-        
-        "resume": f"""Tu es un expert pédagogue français spécialisé en {subject} pour les élèves de 3ème.
-Crée un résumé synthétique avec:
-- Les points essentiels à retenir
-- Maximum 500 mots
-- Structure claire avec titres
-- Mots-clés en gras
-Format en Markdown.""",
-        
-        "trous": f"""Tu es un expert pédagogue français spécialisé en {subject} pour les élèves de 3ème.
-Crée un exercice de texte à trous avec:
-- 10-15 mots manquants (remplacés par _____)
-- Un texte cohérent sur le sujet demandé
-- La liste des mots à placer en désordre
-- Les réponses à la fin
-Format en Markdown."""
-    }
-    return prompts.get(revision_type, prompts["fiche"])
+def build_user_message(request: RevisionRequest) -> "UserMessage":
+    from emergentintegrations.llm.chat import UserMessage, ImageContent
+
+    # Build message with optional image
+    if request.image_base64:
+        image_content = ImageContent(image_base64=request.image_base64)
+        return UserMessage(
+            text=f"Voici le sujet/cours à réviser: {request.prompt}\n\nAnalyse également l'image jointe si pertinente.",
+            file_contents=[image_content]
+        )
+    return UserMessage(text=f"Voici le sujet/cours à réviser: {request.prompt}")
+
+async def process_image(data) -> ProcessedImage:
+    try:
+        processed = await image_pipeline.process(data)
+    except InvalidImage as e:
+        raise HTTPException(status_code=400, detail=f"Image invalide: {e}")
+    logger.info(
+        f"Image preprocessed: {processed.bytes_before} -> {processed.bytes_after} bytes "
+        f"({processed.width}x{processed.height}, phash {processed.phash})"
+    )
+    return processed
+
+def generation_cache_key(request: RevisionRequest) -> str:
+    return generation_key(
+        request.subject, request.revision_type, request.prompt,
+        image_digest(request.image_base64), f"{LLM_PROVIDER}/{LLM_MODEL}", template_digest(request.revision_type)
+    )
+
+async def generate_content(request: RevisionRequest, image_processed: bool = False) -> str:
+    raw_key = None
+    if request.image_base64 and not image_processed:
+        # Keyed on the image as sent: a re-sent image is answered before it
+        # costs a trip through the process pool
+        raw_key = generation_cache_key(request)
+        response = await generation_cache.get(raw_key)
+        if response is not None:
+            return response
+        processed = await process_image(request.image_base64)
+        request = request.model_copy(update={"image_base64": processed.image_base64})
+    cache_key = generation_cache_key(request)
+    response = await generation_cache.get(cache_key)
+    cached = response is not None
+    if not cached:
+        # Identical requests arriving together share one LLM call
+        response, cached = await generation_flight.do(cache_key, lambda: call_llm(request, cache_key))
+    if cached and raw_key not in (None, cache_key):
+        # No prompt in the meta: refresh_similar_prompts skips the alias
+        await generation_cache.set(raw_key, response, meta={"has_image": True})
+    return response
+
+async def call_llm(request: RevisionRequest, cache_key: str) -> Tuple[str, bool]:
+    """The generated content, and whether it was cached under `cache_key`."""
+    try:
+        async with llm_queue.turn(llm_client.get()):
+            completion = await llm_gateway.complete(
+                get_system_prompt(request.subject, request.revision_type),
+                build_user_message(request),
+                label=request.revision_type
+            )
+    except LlmTimeout as e:
+        logger.error(f"Revision generation timed out: {e}")
+        raise HTTPException(status_code=504, detail="La génération a pris trop de temps, réessayez")
+    except LlmUnavailable as e:
+        logger.error(f"Error generating revision: {e}")
+        raise HTTPException(status_code=500, detail=f"Erreur de génération: {str(e)}")
+    
+    response = completion.text
+    if completion.route != llm_gateway.primary:
+        # Lookups are keyed on the primary model: a fallback answer is served
+        # once but never cached as if the primary had written it
+        return response, False
+    model = str(completion.route)
+    template = template_digest(request.revision_type)
+    await generation_cache.set(cache_key, response, meta={
+        "subject": request.subject,
+        "revision_type": request.revision_type,
+        "prompt": request.prompt,
+        "model": model,
+        "template": template,
+        "has_image": bool(request.image_base64)
+    })
+    # Answers to an image depend on it, not only on the prompt
+    if not request.image_base64:
+        similar_prompts.add((request.subject, request.revision_type, model, template), request.prompt, cache_key)
+    return response, True
+
+async def find_similar(request: RevisionRequest) -> Optional[tuple]:
+    """(content, match) of an earlier generation for a near-duplicate prompt."""
+    if request.image_base64 or not request.allow_similar:
+        return None
+    # Answers written from another prompt template are never reused
+    scope = (request.subject, request.revision_type, f"{LLM_PROVIDER}/{LLM_MODEL}", template_digest(request.revision_type))
+    match = similar_prompts.find(scope, request.prompt)
+    # The same prompt is an exact cache hit, handled by generate_content
+    if match is None or match.key == generation_cache_key(request):
+        return None
+    content = await generation_cache.get(match.key)
+    if content is None:
+        similar_prompts.discard(match.key)
+        return None
+    similar_prompts.reused += 1
+    return content, match
+
+async def refresh_similar_prompts(synced_at: Optional[datetime]) -> Optional[datetime]:
+    async for doc in generation_cache.created_since(synced_at, similar_prompts.maxsize):
+        synced_at = doc["created_at"]
+        if doc.get("prompt") and not doc.get("has_image"):
+            # Entries cached before templates were tracked get a scope no lookup uses
+            scope = (doc["subject"], doc["revision_type"], doc["model"], doc.get("template", ""))
+            similar_prompts.add(scope, doc["prompt"], doc["_id"])
+    return synced_at
+
+async def sync_similar_prompts(synced_at: Optional[datetime]):
+    # Picks up what other workers generated since the startup load
+    while True:
+        await asyncio.sleep(SIMILAR_PROMPT_REFRESH_INTERVAL)
+        try:
+            synced_at = await refresh_similar_prompts(synced_at)
+        except Exception as e:
+            logger.error(f"Error syncing similar prompts: {e}")
+
+async def new_revision(
+    request: RevisionRequest,
+    user_id: Optional[str],
+    content: str,
+    revision_id: Optional[str] = None,
+    similar: Optional[SimilarMatch] = None
+) -> RevisionResponse:
+    revision = RevisionResponse(
+        id=revision_id or str(uuid.uuid4()),
+        user_id=user_id,
+        prompt=request.prompt,
+        subject=request.subject,
+        revision_type=request.revision_type,
+        content=content,
+        created_at=datetime.now(timezone.utc).isoformat(),
+        similar_prompt=similar.prompt if similar else None,
+        similarity=round(similar.similarity, 3) if similar else None
+    )
+    # Lets the client save it later by id without sending the content back
+    await recent_generations.set(revision.id, {
+        **revision.model_dump(),
+        "structured": parse_revision(request.revision_type, content)
+    })
+    return revision
 
 @api_router.post("/generate", response_model=RevisionResponse)
-async def generate_revision(request: RevisionRequest, authorization: str = Header(None)):
+async def generate_revision(request: RevisionRequest, http_request: Request, authorization: str = Header(None)):
     
     if not EMERGENT_LLM_KEY:
         raise HTTPException(status_code=500, detail="Clé API non configurée")
     
     user = await get_current_user(authorization)
+    await admit(http_request, user, "generate")
     user_id = user["id"] if user else None
     
-    session_id = str(uuid.uuid4())
-    system_prompt = get_system_prompt(request.subject, request.revision_type)
+    similar = await find_similar(request)
+    if similar is not None:
+        content, match = similar
+        return await new_revision(request, user_id, content, similar=match)
     
-    chat = LlmChat(
-        api_key=EMERGENT_LLM_KEY,
-        session_id=session_id,
-        system_message=system_prompt
-    ).with_model("openai", "gpt-5.2")
+    response = await generate_content(request)
     
-    # Build message with optional image
-    if request.image_base64:
-        image_content = ImageContent(image_base64=request.image_base64)
-        user_message = UserMessage(
-            text=f"Voici le sujet/cours à réviser: {request.prompt}\n\nAnalyse également l'image jointe si pertinente.",
-            file_contents=[image_content]
-        )
-    else:
-        user_message = UserMessage(text=f"Voici le sujet/cours à réviser: {request.prompt}")
+    return await new_revision(request, user_id, response)
+
+async def read_upload(upload: UploadFile, limit: int) -> bytes:
+    # UploadFile is already spooled by Starlette (the body cap bounds it); the image part alone is checked here
+    chunks = []
+    size = 0
+    while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=413, detail="Image trop volumineuse")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+@api_router.post("/generate/upload", response_model=RevisionResponse)
+async def generate_revision_upload(
+    http_request: Request,
+    prompt: str = Form(...),
+    subject: str = Form(...),
+    revision_type: str = Form(...),
+    image: Optional[UploadFile] = File(None),
+    authorization: str = Header(None)
+):
+    
+    if not EMERGENT_LLM_KEY:
+        raise HTTPException(status_code=500, detail="Clé API non configurée")
     
+    user = await get_current_user(authorization)
+    await admit(http_request, user, "generate_upload")
+    user_id = user["id"] if user else None
+    
+    request = RevisionRequest(prompt=prompt, subject=subject, revision_type=revision_type)
+    if image is not None:
+        processed = await process_image(await read_upload(image, MAX_UPLOAD_BYTES))
+        request.image_base64 = processed.image_base64
+    
+    response = await generate_content(request, image_processed=True)
+    
+    return await new_revision(request, user_id, response)
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def split_markdown(content: str) -> List[str]:
+    # Paragraph-sized chunks; joining them gives back the exact content
+    parts = re.split(r"(?<=\n\n)", content)
+    return [part for part in parts if part]
+
+@api_router.post("/generate/stream")
+async def generate_revision_stream(request: RevisionRequest, http_request: Request, authorization: str = Header(None)):
+    
+    if not EMERGENT_LLM_KEY:
+        raise HTTPException(status_code=500, detail="Clé API non configurée")
+    
+    user = await get_current_user(authorization)
+    await admit(http_request, user, "generate")
+    user_id = user["id"] if user else None
+    
+    revision_id = str(uuid.uuid4())
+    
+    async def events():
+        # Flush headers and a first event right away so the client can show progress
+        yield sse_event("start", {"id": revision_id})
+        task = asyncio.create_task(generate_content(request))
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=STREAM_HEARTBEAT_INTERVAL)
+                if done:
+                    break
+                yield ": keep-alive\n\n"
+            try:
+                response = task.result()
+                chunks = split_markdown(response)
+                revision = await new_revision(request, user_id, response, revision_id)
+            except HTTPException as e:
+                yield sse_event("error", {"detail": e.detail})
+                return
+            except Exception as e:
+                # The response has started: a raised error would only cut the stream
+                logger.error(f"Error streaming revision {revision_id}: {e}")
+                yield sse_event("error", {"detail": f"Erreur de génération: {str(e)}"})
+                return
+            for chunk in chunks:
+                yield sse_event("chunk", {"text": chunk})
+            yield sse_event("done", revision.model_dump(exclude={"content"}))
+        finally:
+            # Client went away before the LLM answered
+            if not task.done():
+                task.cancel()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+class BatchItemResult(BaseModel):
+    subject: str
+    revision_type: str
+    revision: Optional[RevisionResponse] = None
+    error: Optional[str] = None
+
+class BatchRevisionResponse(BaseModel):
+    results: List[BatchItemResult]
+
+def batch_size(batch: BatchRevisionRequest) -> int:
+    count = len(batch.subjects or [batch.subject]) * len(batch.revision_types)
+    if count > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Maximum {MAX_BATCH_ITEMS} révisions par lot")
+    return count
+
+async def prepare_batch(batch: BatchRevisionRequest) -> List[RevisionRequest]:
+    # The image is normalized once and shared by every item
+    image_base64 = None
+    if batch.image_base64:
+        image_base64 = (await process_image(batch.image_base64)).image_base64
+    
+    return [
+        RevisionRequest(prompt=batch.prompt, subject=subject, revision_type=revision_type, image_base64=image_base64)
+        for subject in batch.subjects or [batch.subject]
+        for revision_type in batch.revision_types
+    ]
+
+async def generate_batch_item(request: RevisionRequest, user_id: Optional[str]) -> BatchItemResult:
     try:
-        response = await chat.send_message(user_message)
-        
-        revision_id = str(uuid.uuid4())
-        created_at = datetime.now(timezone.utc).isoformat()
-        
-        return RevisionResponse(
-            id=revision_id,
-            user_id=user_id,
-            prompt=request.prompt,
-            subject=request.subject,
-            revision_type=request.revision_type,
-            content=response,
-            created_at=created_at
-        )
+        response = await generate_content(request, image_processed=True)
+        revision = await new_revision(request, user_id, response)
+    except HTTPException as e:
+        return BatchItemResult(subject=request.subject, revision_type=request.revision_type, error=e.detail)
     except Exception as e:
-        logger.error(f"Error generating revision: {e}")
-        raise HTTPException(status_code=500, detail=f"Erreur de génération: {str(e)}")
+        # A failed item (e.g. a cache write) must not take the rest of the batch down
+        logger.error(f"Error generating batch item {request.subject}/{request.revision_type}: {e}")
+        return BatchItemResult(
+            subject=request.subject, revision_type=request.revision_type, error=f"Erreur de génération: {str(e)}"
+        )
+    return BatchItemResult(subject=request.subject, revision_type=request.revision_type, revision=revision)
 
-# ============== SAVED REVISIONS ==============
+@api_router.post("/generate/batch", response_model=BatchRevisionResponse)
+async def generate_revision_batch(batch: BatchRevisionRequest, http_request: Request, authorization: str = Header(None)):
+    
+    if not EMERGENT_LLM_KEY:
+        raise HTTPException(status_code=500, detail="Clé API non configurée")
+    
+    user = await get_current_user(authorization)
+    user_id = user["id"] if user else None
+    
+    # Admission first: a rate-limited caller must not cost image processing
+    await admit(http_request, user, "generate_batch", count=batch_size(batch))
+    requests = await prepare_batch(batch)
+    results = await asyncio.gather(*[generate_batch_item(request, user_id) for request in requests])
+    return BatchRevisionResponse(results=results)
 
-@api_router.post("/revisions", response_model=RevisionResponse)
-async def save_revision(request: SaveRevisionRequest, authorization: str = Header(None)):
+@api_router.post("/generate/batch/stream")
+async def generate_revision_batch_stream(batch: BatchRevisionRequest, http_request: Request, authorization: str = Header(None)):
+    
+    if not EMERGENT_LLM_KEY:
+        raise HTTPException(status_code=500, detail="Clé API non configurée")
     
     user = await get_current_user(authorization)
-    if not user:
-        raise HTTPException(status_code=401, detail="Connectez-vous pour sauvegarder")
+    user_id = user["id"] if user else None
     
-    revision_id = str(uuid.uuid4())
-    created_at = datetime.now(timezone.utc).isoformat()
+    # Admission first: a rate-limited caller must not cost image processing
+    await admit(http_request, user, "generate_batch", count=batch_size(batch))
+    requests = await prepare_batch(batch)
     
+    async def events():
+        tasks = [asyncio.create_task(generate_batch_item(request, user_id)) for request in requests]
+        try:
+            # One event per item, in completion order
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                yield sse_event("result", result.model_dump())
+            yield sse_event("done", {"count": len(tasks)})
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/generate/cache-stats")
+async def get_generation_cache_stats():
+    return generation_cache.stats()
+
+@api_router.get("/generate/image-stats")
+async def get_image_stats():
+    return image_pipeline.stats()
+
+@api_router.get("/generate/similar-stats")
+async def get_similar_stats():
+    return similar_prompts.stats()
+
+@api_router.get("/generate/llm-stats")
+async def get_llm_stats():
+    return llm_gateway.stats()
+
+# ============== GENERATION JOBS ==============
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+    result: Optional[RevisionResponse] = None
+    error: Optional[str] = None
+
+async def run_generation_job(job: dict) -> dict:
+    request = RevisionRequest(**job["payload"])
+    # Anonymous jobs share one fair-queue key, they already run at lower priority
+    llm_client.set(f"user:{job['user_id']}" if job["user_id"] else "anonymous")
+    response = await generate_content(request, image_processed=True)
+    return (await new_revision(request, job["user_id"], response)).model_dump()
+
+job_queue = JobQueue(job_backend, run_generation_job, workers=JOB_WORKERS)
+
+def job_response(job: dict) -> JobResponse:
+    return JobResponse(job_id=job["id"], status=job["status"], result=job.get("result"), error=job.get("error"))
+
+@api_router.post("/jobs/generate", response_model=JobResponse, status_code=202)
+async def submit_generation_job(request: RevisionRequest, http_request: Request, authorization: str = Header(None)):
+    
+    if not EMERGENT_LLM_KEY:
+        raise HTTPException(status_code=500, detail="Clé API non configurée")
+    
+    user = await get_current_user(authorization)
+    await admit(http_request, user, "generate_job")
+    user_id = user["id"] if user else None
+    
+    # Keep the queued payload small: only the normalized image is stored
+    if request.image_base64:
+        processed = await process_image(request.image_base64)
+        request = request.model_copy(update={"image_base64": processed.image_base64})
+    
+    try:
+        job = await job_queue.submit(request.model_dump(), priority=0 if user else 1, user_id=user_id)
+    except QueueFull:
+        raise HTTPException(
+            status_code=429,
+            detail="Trop de demandes en cours, réessayez plus tard",
+            headers={"Retry-After": str(JOB_RETRY_AFTER)}
+        )
+    return job_response(job)
+
+@api_router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_generation_job(
+    job_id: str,
+    authorization: str = Header(None),
+    wait: float = Query(0, ge=0, le=60)
+):
+    
+    job = await job_queue.wait(job_id, wait) if wait else await job_queue.get(job_id)
+    if job and job["user_id"]:
+        user = await get_current_user(authorization)
+        if not user or user["id"] != job["user_id"]:
+            job = None
+    if not job:
+        raise HTTPException(status_code=404, detail="Tâche non trouvée")
+    return job_response(job)
+
+# ============== SAVED REVISIONS ==============
+
+def revision_documents(
+    user_id: str, request: SaveRevisionRequest, created_at: str, structured: Optional[dict] = None
+) -> tuple:
+    """The revision as returned to the client, and as stored (still missing its content_hash)."""
     revision = {
-        "id": revision_id,
-        "user_id": user["id"],
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
         "prompt": request.prompt,
         "subject": request.subject,
         "revision_type": request.revision_type,
@@ -285,19 +981,339 @@ async def save_revision(request: SaveRevisionRequest, authorization: str = Heade
         "created_at": created_at
     }
     
-    await db.revisions.insert_one(revision)
+    stored = {k: v for k, v in revision.items() if k != "content"}
+    # Content terms are indexed once per blob, see BlobStore
+    stored.update(title_fields(request.prompt, request.subject))
+    # Quizzes and decks are parsed once here, not on every display
+    stored["structured"] = structured or parse_revision(request.revision_type, request.content)
+    return revision, stored
+
+async def store_revision(
+    user_id: str, request: SaveRevisionRequest, structured: Optional[dict] = None
+) -> RevisionResponse:
+    created_at = datetime.now(timezone.utc).isoformat()
+    revision, stored = revision_documents(user_id, request, created_at, structured)
+    stored["content_hash"] = await blob_store.put(request.content, request.revision_type)
+    await db.revisions.insert_one(stored)
     
     return RevisionResponse(**revision)
 
-@api_router.get("/revisions", response_model=List[RevisionResponse])
-async def get_revisions(authorization: str = Header(None)):
+@api_router.post("/revisions", response_model=RevisionResponse)
+async def save_revision(request: SaveRevisionRequest, authorization: str = Header(None)):
+    
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Connectez-vous pour sauvegarder")
+    
+    return await store_revision(user["id"], request)
+
+@api_router.post("/revisions/from-generation/{generation_id}", response_model=RevisionResponse)
+async def save_generated_revision(generation_id: str, authorization: str = Header(None)):
+    
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Connectez-vous pour sauvegarder")
+    
+    generation = await recent_generations.get(generation_id)
+    # Anonymous generations may be saved by whoever logs in afterwards
+    if not generation or generation["user_id"] not in (None, user["id"]):
+        raise HTTPException(status_code=404, detail="Génération expirée ou introuvable")
+    
+    return await store_revision(user["id"], SaveRevisionRequest(**generation), generation.get("structured"))
+
+async def import_chunk(user_id: str, items: List[tuple], results: List[BulkItemResult]) -> int:
+    """Store one chunk of validated (index, item) pairs with two bulk writes."""
+    def created_at(item: BulkRevisionItem) -> str:
+        if item.created_at is None:
+            return now
+        if item.created_at.tzinfo is None:
+            return item.created_at.replace(tzinfo=timezone.utc).isoformat()
+        return item.created_at.astimezone(timezone.utc).isoformat()
+    
+    now = datetime.now(timezone.utc).isoformat()
+    # Term indexing and parsing of a whole chunk would stall the event loop
+    documents = await asyncio.to_thread(
+        lambda: [revision_documents(user_id, item, created_at(item))[1] for _, item in items]
+    )
+    digests = await blob_store.put_many([(item.content, item.revision_type) for _, item in items])
+    for stored, digest in zip(documents, digests):
+        stored["content_hash"] = digest
+    
+    failed = {}
+    try:
+        await db.revisions.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        failed = {error["index"]: error.get("errmsg", "Erreur d'écriture") for error in e.details.get("writeErrors", [])}
+        await blob_store.release_many(digests[i] for i in failed)
+    
+    for position, ((index, _), stored) in enumerate(zip(items, documents)):
+        if position in failed:
+            results[index] = BulkItemResult(index=index, error=failed[position])
+        else:
+            results[index] = BulkItemResult(index=index, id=stored["id"])
+    return len(items) - len(failed)
+
+@api_router.post("/revisions/bulk", response_model=BulkImportResponse)
+async def import_revisions(request: BulkImportRequest, authorization: str = Header(None)):
+    
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Connectez-vous pour sauvegarder")
+    
+    results: List[Optional[BulkItemResult]] = [None] * len(request.revisions)
+    valid = []
+    for index, raw in enumerate(request.revisions):
+        try:
+            valid.append((index, BulkRevisionItem.model_validate(raw)))
+        except ValidationError as e:
+            first = e.errors()[0]
+            field = ".".join(str(part) for part in first["loc"]) or "révision"
+            results[index] = BulkItemResult(index=index, error=f"{field}: {first['msg']}")
+    
+    created = 0
+    for start in range(0, len(valid), BULK_CHUNK_SIZE):
+        created += await import_chunk(user["id"], valid[start:start + BULK_CHUNK_SIZE], results)
+    
+    return BulkImportResponse(created=created, results=results)
+
+@api_router.post("/revisions/bulk-delete", response_model=BulkDeleteResponse)
+async def delete_revisions(request: BulkDeleteRequest, authorization: str = Header(None)):
     
     user = await get_current_user(authorization)
     if not user:
         raise HTTPException(status_code=401, detail="Non authentifié")
     
-    revisions = await db.revisions.find({"user_id": user["id"]}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return revisions
+    ids = list(dict.fromkeys(request.ids))
+    deleted = set()
+    for start in range(0, len(ids), BULK_CHUNK_SIZE):
+        chunk = ids[start:start + BULK_CHUNK_SIZE]
+        # Claim the revisions first: a concurrent delete of the same ids must
+        # not release their blobs a second time
+        claim = str(uuid.uuid4())
+        try:
+            await db.revisions.update_many(
+                {"id": {"$in": chunk}, "user_id": user["id"], "deleting": {"$exists": False}},
+                {"$set": {"deleting": claim}}
+            )
+            claimed = await db.revisions.find(
+                {"id": {"$in": chunk}, "deleting": claim}, {"_id": 0, "id": 1, "content_hash": 1}
+            ).to_list(None)
+            await db.revisions.delete_many({"id": {"$in": chunk}, "deleting": claim})
+        finally:
+            # Failed or cancelled before the delete: leave the revisions deletable again
+            await db.revisions.update_many({"id": {"$in": chunk}, "deleting": claim}, {"$unset": {"deleting": ""}})
+        await blob_store.release_many(r["content_hash"] for r in claimed if "content_hash" in r)
+        deleted.update(r["id"] for r in claimed)
+    
+    return BulkDeleteResponse(deleted=len(deleted), not_found=[i for i in ids if i not in deleted])
+
+def encode_cursor(revision: dict) -> str:
+    raw = json.dumps([revision["created_at"], revision["id"]]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        created_at, revision_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(created_at), str(revision_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+
+@api_router.get("/revisions", response_model=RevisionPage)
+async def get_revisions(
+    authorization: str = Header(None),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Non authentifié")
+    
+    # Keyset pagination on (created_at, id), newest first
+    query = after_cursor({"user_id": user["id"]}, cursor)
+    revisions = await db.revisions.find(query, SUMMARY_PROJECTION).sort(
+        [("created_at", -1), ("id", -1)]
+    ).to_list(limit + 1)
+    
+    next_cursor = encode_cursor(revisions[limit - 1]) if len(revisions) > limit else None
+    return RevisionPage(items=revisions[:limit], next_cursor=next_cursor)
+
+@api_router.get("/revisions/search", response_model=SearchPage)
+async def search_revisions(
+    q: str = Query(..., min_length=1, max_length=200),
+    subject: Optional[str] = None,
+    revision_type: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    authorization: str = Header(None)
+):
+    
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Non authentifié")
+    
+    terms = query_terms(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Recherche trop vague")
+    try:
+        offset = int(base64.urlsafe_b64decode(cursor.encode('ascii'))) if cursor else 0
+    except Exception:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+    
+    # Blobs whose content holds a query term, by the search_terms index; the
+    # revisions query keeps this user's among them, and those matching by
+    # prompt/subject
+    matching = await db.revision_blobs.find({"search_terms": {"$in": terms}}, {"_id": 1}).to_list(SEARCH_MAX_BLOBS + 1)
+    capped = len(matching) > SEARCH_MAX_BLOBS
+    hashes = [blob["_id"] for blob in matching[:SEARCH_MAX_BLOBS]]
+    query = {"user_id": user["id"], "$or": [
+        {"search_terms": {"$in": terms}}, {"content_hash": {"$in": hashes}}
+    ]}
+    if subject:
+        query["subject"] = subject
+    if revision_type:
+        query["revision_type"] = revision_type
+    # Ranking reads every candidate: past SEARCH_MAX_CANDIDATES, only the newest are ranked
+    projection = stats_projection(terms, {**SUMMARY_PROJECTION, "content_hash": 1, "search_v": 1})
+    candidates = await db.revisions.find(query, projection).sort(
+        [("created_at", -1), ("id", -1)]
+    ).to_list(SEARCH_MAX_CANDIDATES + 1)
+    capped = capped or len(candidates) > SEARCH_MAX_CANDIDATES
+    candidates = candidates[:SEARCH_MAX_CANDIDATES]
+    # Content statistics only for the blobs the candidates point to
+    blobs = {
+        blob["_id"]: blob for blob in await db.revision_blobs.find(
+            {"_id": {"$in": list({revision.get("content_hash") for revision in candidates})}, "search_terms": {"$in": terms}},
+            stats_projection(terms, {})
+        ).to_list(None)
+    }
+    candidates = [combine(revision, blobs.get(revision.get("content_hash"))) for revision in candidates]
+    # IDF needs the number of revisions the candidates were drawn from
+    total = await db.revisions.count_documents({"user_id": user["id"]})
+    next_offset = offset + limit
+    page = rank(candidates, terms, total, top=next_offset)[offset:]
+    return SearchPage(
+        items=[SearchResult(**doc, score=round(score, 4)) for score, doc in page],
+        total=len(candidates),
+        total_capped=capped,
+        next_cursor=base64.urlsafe_b64encode(str(next_offset).encode()).decode('ascii') if next_offset < len(candidates) else None
+    )
+
+def after_cursor(query: dict, cursor: Optional[str]) -> dict:
+    # Keyset condition for revisions older than the cursor, in (created_at, id) order
+    if cursor:
+        created_at, revision_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": revision_id}}
+        ]
+    return query
+
+async def export_batches(user_id: str, cursor: Optional[str]):
+    """Yield a user's revisions with their content, EXPORT_BATCH_SIZE at a time."""
+    revisions = db.revisions.find(after_cursor({"user_id": user_id}, cursor), REVISION_PROJECTION).sort(
+        [("created_at", -1), ("id", -1)]
+    ).batch_size(EXPORT_BATCH_SIZE)
+    while True:
+        batch = await revisions.to_list(EXPORT_BATCH_SIZE)
+        if not batch:
+            return
+        # One blob lookup per batch rather than per revision
+        contents = await blob_store.get_many(r["content_hash"] for r in batch if "content_hash" in r)
+        await content_codec.ensure(r.get("content_dict", 0) for r in batch if "content_hash" not in r)
+        for revision in batch:
+            digest = revision.pop("content_hash", None)
+            if digest is not None:
+                revision["content"] = contents.get(digest, "")
+            else:
+                content_codec.decode(revision)
+            revision["cursor"] = encode_cursor(revision)
+        yield batch
+
+@api_router.get("/revisions/export")
+async def export_revisions(
+    format: str = Query("ndjson", pattern="^(ndjson|zip)$"),
+    cursor: Optional[str] = None,
+    authorization: str = Header(None)
+):
+    
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Non authentifié")
+    if cursor:
+        decode_cursor(cursor)
+    
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d")
+    if format == "ndjson":
+        async def body():
+            async for batch in export_batches(user["id"], cursor):
+                yield ndjson_chunk(batch)
+        media_type, filename = "application/x-ndjson", f"revisions-{stamp}.ndjson"
+    else:
+        async def body():
+            archive = ZipExport()
+            async for batch in export_batches(user["id"], cursor):
+                yield archive.add(batch)
+            yield archive.close()
+        media_type, filename = "application/zip", f"revisions-{stamp}.zip"
+    
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@api_router.get("/revisions/{revision_id}", response_model=RevisionResponse)
+async def get_revision(revision_id: str, authorization: str = Header(None)):
+    
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Non authentifié")
+    
+    revision = await db.revisions.find_one({"id": revision_id, "user_id": user["id"]}, REVISION_PROJECTION)
+    if not revision:
+        raise HTTPException(status_code=404, detail="Révision non trouvée")
+    
+    return await blob_store.load_content(revision)
+
+async def load_structured(revision_id: str, user: dict) -> dict:
+    revision = await db.revisions.find_one(
+        {"id": revision_id, "user_id": user["id"]},
+        {"_id": 0, "revision_type": 1, "structured": 1, "content_hash": 1, "content": 1, "content_z": 1, "content_dict": 1}
+    )
+    if not revision:
+        raise HTTPException(status_code=404, detail="Révision non trouvée")
+    if "structured" in revision:
+        structured = revision["structured"]
+    else:
+        # Saved before parsing existed: parse once and keep the result
+        content = (await blob_store.load_content(revision))["content"]
+        structured = parse_revision(revision["revision_type"], content)
+        await db.revisions.update_one({"id": revision_id}, {"$set": {"structured": structured}})
+    if not structured:
+        raise HTTPException(status_code=404, detail="Pas de version interactive pour cette révision")
+    return structured
+
+@api_router.get("/revisions/{revision_id}/structured")
+async def get_revision_structured(revision_id: str, authorization: str = Header(None)):
+    
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Non authentifié")
+    
+    return public_view(await load_structured(revision_id, user))
+
+@api_router.post("/revisions/{revision_id}/grade")
+async def grade_revision(revision_id: str, submission: QuizAnswers, authorization: str = Header(None)):
+    
+    user = await get_current_user(authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Non authentifié")
+    
+    structured = await load_structured(revision_id, user)
+    if structured["kind"] == "flashcard":
+        raise HTTPException(status_code=400, detail="Les flashcards ne se corrigent pas")
+    return grade(structured, submission.answers)
 
 @api_router.delete("/revisions/{revision_id}")
 async def delete_revision(revision_id: str, authorization: str = Header(None)):
@@ -306,42 +1322,105 @@ async def delete_revision(revision_id: str, authorization: str = Header(None)):
     if not user:
         raise HTTPException(status_code=401, detail="Non authentifié")
     
-    result = await db.revisions.delete_one({"id": revision_id, "user_id": user["id"]})
-    if result.deleted_count == 0:
+    # Revisions claimed by a bulk delete are released by it
+    revision = await db.revisions.find_one_and_delete(
+        {"id": revision_id, "user_id": user["id"], "deleting": {"$exists": False}},
+        projection={"content_hash": 1}
+    )
+    if not revision:
         raise HTTPException(status_code=404, detail="Révision non trouvée")
+    if "content_hash" in revision:
+        await blob_store.release(revision["content_hash"])
     
     return {"message": "Révision supprimée"}
 
 # ============== SUBJECTS ==============
 
+def catalog_response(entry: CatalogEntry, if_none_match: Optional[str]) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": CACHE_CONTROL}
+    if if_none_match and etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
 @api_router.get("/subjects")
-async def get_subjects():
-    return {
-        "subjects": [
-            {"id": "maths", "name": "Mathématiques", "icon": "calculator"},
-            {"id": "francais", "name": "Français", "icon": "book-open"},
-            {"id": "histoire-geo", "name": "Histoire-Géographie", "icon": "globe"},
-            {"id": "emc", "name": "EMC", "icon": "users"},
-            {"id": "svt", "name": "SVT", "icon": "leaf"},
-            {"id": "physique-chimie", "name": "Physique-Chimie", "icon": "flask-conical"},
-            {"id": "anglais", "name": "Anglais", "icon": "languages"},
-            {"id": "espagnol", "name": "Espagnol", "icon": "languages"},
-            {"id": "musique", "name": "Musique", "icon": "music"},
-            {"id": "arts-plastiques", "name": "Arts Plastiques", "icon": "palette"}
-        ]
-    }
+async def get_subjects(if_none_match: Optional[str] = Header(None)):
+    return catalog_response(SUBJECTS_ENTRY, if_none_match)
 
 @api_router.get("/revision-types")
-async def get_revision_types():
-    return {
-        "types": [
-            {"id": "fiche", "name": "Fiche de révision", "description": "Résumé structuré des notions clés"},
-            {"id": "qcm", "name": "QCM", "description": "Questions à choix multiples pour s'entraîner"},
-            {"id": "flashcard", "name": "Flashcards", "description": "Cartes recto-verso pour mémoriser"},
-            {"id": "resume", "name": "Résumé", "description": "Synthèse courte et efficace"},
-            {"id": "trous", "name": "Texte à trous", "description": "Exercice de complétion"}
-        ]
-    }
+async def get_revision_types(if_none_match: Optional[str] = Header(None)):
+    return catalog_response(REVISION_TYPES_ENTRY, if_none_match)
+
+# Refuse oversized multipart bodies while they are received, before Starlette spools them;
+# the extra chunk leaves room for the multipart framing and form fields
+app.add_middleware(
+    BodyLimitMiddleware,
+    paths={"/api/generate/upload"},
+    max_bytes=MAX_UPLOAD_BYTES + UPLOAD_CHUNK_SIZE,
+    detail="Image trop volumineuse"
+)
+
+@app.exception_handler(HasherBusy)
+async def hasher_busy_handler(request, exc):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Serveur occupé, réessayez dans un instant"},
+        headers={"Retry-After": "1"}
+    )
+
+# ============== METRICS ==============
+
+metrics.callback(
+    "goya_cache_lookups_total", "Cache lookups by result", ["cache", "result"],
+    lambda: {
+        ("generation", "hit"): generation_cache.hits,
+        ("generation", "miss"): generation_cache.misses,
+        ("user", "hit"): user_cache.hits,
+        ("user", "miss"): user_cache.misses,
+    },
+    kind="counter"
+)
+metrics.callback(
+    "goya_llm_in_flight", "Distinct LLM generations in flight", [],
+    lambda: {(): generation_flight.in_flight()}
+)
+metrics.callback(
+    "goya_llm_extra_attempts_total", "LLM attempts beyond the first, by reason", ["reason"],
+    lambda: {
+        ("hedge",): llm_gateway.hedges,
+        ("fallback",): llm_gateway.fallbacks,
+        ("timeout",): llm_gateway.timeouts,
+    },
+    kind="counter"
+)
+metrics.callback(
+    "goya_llm_fair_queue_waiting", "Generations waiting for an LLM slot", [],
+    lambda: {(): llm_queue.waiting()}
+)
+metrics.callback(
+    "goya_bcrypt_pending", "Password operations running or queued", [],
+    lambda: {(): password_hasher.pending}
+)
+
+@api_router.get("/metrics")
+async def get_metrics():
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# ============== HEALTH ==============
+
+@api_router.get("/health/live")
+async def liveness():
+    # The process answers; restart it only when this fails
+    return {"status": "ok"}
+
+@api_router.get("/health/ready")
+async def readiness():
+    # Keep traffic away until the warm-up has run and while MongoDB is unreachable
+    mongo = await ping_mongo()
+    ready = app.state.ready and mongo
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "mongo": mongo, "warm_up": app.state.warm_up, "index_errors": app.state.index_errors}
+    )
 
 # Root endpoint
 @api_router.get("/")
@@ -351,6 +1430,8 @@ async def root():
 # Include router
 app.include_router(api_router)
 
+app.add_middleware(MetricsMiddleware, latency=http_latency, in_flight=http_in_flight)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -358,7 +1439,3 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
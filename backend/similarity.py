@@ -0,0 +1,146 @@
+import re
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict, deque
+from typing import Dict, FrozenSet, Hashable, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+# Words that do not change what a student wants to revise
+STOP_WORDS = frozenset("""
+    a au aux avec ce ces d dans de des du en et l la le les leur leurs ma mes mon notre nos ou par pour sa ses son
+    sur ta tes ton un une vos votre
+    3e 3eme troisieme cours chapitre lecon revision revisions reviser fiche college brevet
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+_MERSENNE = (1 << 61) - 1
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents: "Théorème" -> "theoreme"."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def shingles(prompt: str) -> FrozenSet[str]:
+    # Character trigrams of each meaningful word absorb typos and plural forms
+    result = set()
+    for word in _WORD.findall(fold(prompt)):
+        if word in STOP_WORDS:
+            continue
+        padded = f"#{word}#"
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(result)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+class SimilarMatch(NamedTuple):
+    key: str
+    prompt: str
+    similarity: float
+
+
+class SimilarityIndex:
+    """In-memory MinHash/LSH index of past prompts, partitioned by scope.
+
+    Signatures are split into `bands` of `rows` values; prompts sharing a
+    band are candidates, and candidates are confirmed with the exact Jaccard
+    similarity of their shingles. With 16 bands of 4 rows, pairs around 0.5
+    similarity are found about half the time and pairs above 0.8 nearly
+    always. The oldest prompts are evicted beyond `maxsize`.
+    """
+
+    def __init__(self, threshold: float = 0.8, bands: int = 16, rows: int = 4, maxsize: int = 50_000, seed: int = 1):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.maxsize = maxsize
+        rng = np.random.default_rng(seed)
+        perms = bands * rows
+        # h(x) = (a * x + b) mod p, with 32-bit x so that a * x fits in 64 bits
+        self._a = rng.integers(1, 1 << 31, size=perms, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, size=perms, dtype=np.uint64)
+        self._entries: "OrderedDict[str, Tuple[Hashable, FrozenSet[str], str, list]]" = OrderedDict()
+        self._buckets: Dict[tuple, Set[str]] = {}
+        self.lookups = 0
+        self.matches = 0
+        self.reused = 0
+        self._latencies = deque(maxlen=1024)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _band_keys(self, scope: Hashable, grams: FrozenSet[str]) -> list:
+        values = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+        signature = ((np.outer(values, self._a) + self._b) % _MERSENNE).min(axis=0)
+        return [
+            (scope, band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def add(self, scope: Hashable, prompt: str, key: str):
+        """Index `prompt`, whose result is stored under the cache `key`."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        grams = shingles(prompt)
+        if not grams:
+            return
+        band_keys = self._band_keys(scope, grams)
+        for band_key in band_keys:
+            self._buckets.setdefault(band_key, set()).add(key)
+        self._entries[key] = (scope, grams, prompt, band_keys)
+        while len(self._entries) > self.maxsize:
+            self.discard(next(iter(self._entries)))
+
+    def discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band_key in entry[3]:
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def find(self, scope: Hashable, prompt: str) -> Optional[SimilarMatch]:
+        start = time.perf_counter()
+        self.lookups += 1
+        best = None
+        grams = shingles(prompt)
+        if grams:
+            candidates = set()
+            for band_key in self._band_keys(scope, grams):
+                candidates.update(self._buckets.get(band_key, ()))
+            for key in candidates:
+                _, other, other_prompt, _ = self._entries[key]
+                similarity = jaccard(grams, other)
+                if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                    best = SimilarMatch(key, other_prompt, similarity)
+        if best is not None:
+            self.matches += 1
+        self._latencies.append(time.perf_counter() - start)
+        return best
+
+    def stats(self) -> dict:
+        ordered = sorted(self._latencies)
+
+        def percentile(pct):
+            return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000 if ordered else None
+
+        return {
+            "size": len(self._entries),
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "matches": self.matches,
+            "reused": self.reused,
+            "reuse_rate": self.reused / self.lookups if self.lookups else 0.0,
+            "lookup_p50_ms": percentile(50),
+            "lookup_p99_ms": percentile(99),
+        }
@@ -0,0 +1,246 @@
+"""Structured views of generated QCM, flashcard and texte à trous content.
+
+The LLM answers in loosely formatted Markdown. The parsers below turn it
+once into a compact structure stored next to the revision, so clients
+render quizzes without parsing and answers are graded by index lookup.
+They return None when the content does not look like the expected type.
+"""
+import re
+from typing import Dict, List, Optional
+
+from similarity import fold
+
+PARSED_TYPES = ("qcm", "flashcard", "trous")
+
+_HEADING = re.compile(r"^#{1,6}\s*")
+_LIST_MARKER = re.compile(r"^(?:[-*+•]\s+)+")
+_QUESTION = re.compile(r"^(?:question\s*)?(\d{1,2})\s*(?:[.):\-–]|$)\s*(.*)$", re.IGNORECASE)
+_OPTION = re.compile(r"^([A-Da-d])\s*[).:\-–]\s*(.+)$")
+_ANSWER = re.compile(
+    r"^\W*(?:la\s+)?(?:bonne\s+)?r[ée]ponse(?:\s+(?:correcte|juste|exacte))?\s*[:：]\s*([A-Da-d])\b[\s).:\-–]*(.*)$",
+    re.IGNORECASE
+)
+_EXPLANATION = re.compile(r"^\W*explication\s*[:：]\s*(.*)$", re.IGNORECASE)
+_KEY_ENTRY = re.compile(r"(\d{1,2})\s*[.):\-–→=]\s*\(?([A-Da-d])\b")
+_CORRECT_MARK = re.compile(r"\s*(?:✅|✔️?|\(correct[e]?\))\s*")
+_SECTION_KEYS = ("reponses", "corrige", "correction", "solutions")
+_RECTO = re.compile(r"^\W*recto\b\s*[:：\-–]?\s*(.*)$", re.IGNORECASE)
+_VERSO = re.compile(r"^\W*verso\b\s*[:：\-–]?\s*(.*)$", re.IGNORECASE)
+_CARD_TITLE = re.compile(r"^\W*(?:carte|flashcard|fiche)\s*(?:n°|no\.?)?\s*\d+\W*$", re.IGNORECASE)
+_GAP = re.compile(r"(?:\(\d{1,2}\)\s*)?_{3,}(?:\s*\(\d{1,2}\))?")
+_NUMBERED = re.compile(r"^(?:\d{1,2}\s*[.):\-–]\s*)(.+)$")
+_BANK_SEPARATORS = re.compile(r"\s*[,;|/•]\s*|\s+[–—-]\s+")
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+
+
+def clean(line: str) -> str:
+    line = _HEADING.sub("", line.strip())
+    line = _LIST_MARKER.sub("", line)
+    return line.replace("**", "").replace("__", "").strip(" *_\t")
+
+
+def is_heading(line: str) -> bool:
+    stripped = line.strip()
+    return stripped.startswith("#") or (stripped.startswith("**") and stripped.endswith("**") and len(stripped) > 4)
+
+
+def is_answer_section(line: str) -> bool:
+    title = fold(clean(line))
+    return any(key in title for key in _SECTION_KEYS) and not _ANSWER.match(clean(line))
+
+
+# ============== QCM ==============
+
+def parse_qcm(content: str) -> Optional[dict]:
+    questions: List[dict] = []
+    key: Dict[int, str] = {}
+    current = None
+    in_key = False
+
+    for raw in content.splitlines():
+        if not raw.strip() or re.fullmatch(r"\s*[-*_]{3,}\s*", raw):
+            continue
+        line = clean(raw)
+        if (is_heading(raw) or line.endswith(":")) and is_answer_section(raw):
+            in_key = True
+            continue
+        if in_key:
+            for number, letter in _KEY_ENTRY.findall(line):
+                key[int(number)] = letter.upper()
+            continue
+
+        option = _OPTION.match(line)
+        if option and current is not None:
+            text = option.group(2)
+            if _CORRECT_MARK.search(text):
+                current["answer"] = option.group(1).upper()
+                text = _CORRECT_MARK.sub(" ", text).strip()
+            current["options"][option.group(1).upper()] = text
+            continue
+        answer = _ANSWER.match(line)
+        if answer and current is not None:
+            current["answer"] = answer.group(1).upper()
+            if answer.group(2):
+                current["explanation"] = answer.group(2).strip()
+            continue
+        explanation = _EXPLANATION.match(line)
+        if explanation and current is not None:
+            current["explanation"] = explanation.group(1).strip()
+            continue
+        question = _QUESTION.match(line)
+        if question and (current is None or current["options"]):
+            current = {"number": int(question.group(1)), "text": question.group(2).strip(),
+                       "options": {}, "answer": None, "explanation": None}
+            questions.append(current)
+            continue
+        if current is None:
+            continue
+        # Continuation lines: question text before the options, explanation after
+        if not current["options"]:
+            current["text"] = f"{current['text']} {line}".strip()
+        elif current["explanation"] is not None:
+            current["explanation"] = f"{current['explanation']} {line}".strip()
+
+    parsed = []
+    for question in questions:
+        if len(question["options"]) < 2:
+            continue
+        letters = sorted(question["options"])
+        answer = question["answer"] or key.get(question["number"])
+        parsed.append({
+            "question": question["text"],
+            "choices": [question["options"][letter] for letter in letters],
+            "answer": letters.index(answer) if answer in letters else None,
+            "explanation": question["explanation"],
+        })
+    return {"kind": "qcm", "questions": parsed} if parsed else None
+
+
+# ============== FLASHCARDS ==============
+
+def parse_flashcards(content: str) -> Optional[dict]:
+    cards = []
+    current = None
+    side = None
+    for raw in content.splitlines():
+        line = clean(raw)
+        if not line or re.fullmatch(r"[-*_]{3,}", raw.strip()) or _CARD_TITLE.match(line):
+            continue
+        recto = _RECTO.match(line)
+        verso = _VERSO.match(line)
+        if recto:
+            current = {"front": recto.group(1).strip(), "back": ""}
+            cards.append(current)
+            side = "front"
+        elif verso and current is not None:
+            current["back"] = verso.group(1).strip()
+            side = "back"
+        elif current is not None and not is_heading(raw):
+            current[side] = f"{current[side]}\n{line}".strip()
+
+    if not cards:
+        # No RECTO/VERSO labels: one card per ---separated block, first line as the front
+        for block in re.split(r"\n\s*-{3,}\s*\n", content):
+            lines = [clean(line) for line in block.splitlines() if clean(line) and not is_heading(line)]
+            if len(lines) >= 2:
+                cards.append({"front": lines[0], "back": "\n".join(lines[1:])})
+
+    cards = [card for card in cards if card["front"] and card["back"]]
+    return {"kind": "flashcard", "cards": cards} if cards else None
+
+
+# ============== TEXTE À TROUS ==============
+
+def split_sections(content: str) -> List[tuple]:
+    sections = [("", [])]
+    for raw in content.splitlines():
+        if is_heading(raw):
+            sections.append((fold(clean(raw)), []))
+        elif raw.strip():
+            sections[-1][1].append(raw.strip())
+    return sections
+
+
+def parse_trous(content: str) -> Optional[dict]:
+    text_lines, bank, answers = [], [], []
+    for title, lines in split_sections(content):
+        if any(key in title for key in _SECTION_KEYS):
+            for line in lines:
+                numbered = _NUMBERED.match(clean(line))
+                if numbered:
+                    answers.append(clean(numbered.group(1)))
+                elif _GAP.search(line) is None:
+                    # Text repeated with the answers in bold
+                    answers.extend(_BOLD.findall(line))
+        elif "mots" in title or "liste" in title:
+            for line in lines:
+                bank.extend(word for word in _BANK_SEPARATORS.split(clean(line)) if word)
+        elif any(_GAP.search(line) for line in lines) or text_lines:
+            text_lines.extend(line for line in lines if not re.fullmatch(r"[-*_]{3,}", line))
+
+    gaps = 0
+    numbered_text = []
+    for line in text_lines:
+        def number(_):
+            nonlocal gaps
+            gaps += 1
+            return f"{{{gaps}}}"
+        numbered_text.append(_GAP.sub(number, line))
+    if not gaps:
+        return None
+    answers = (answers + [None] * gaps)[:gaps]
+    return {"kind": "trous", "text": "\n".join(numbered_text), "word_bank": bank, "answers": answers}
+
+
+# ============== VIEWS AND GRADING ==============
+
+PARSERS = {"qcm": parse_qcm, "flashcard": parse_flashcards, "trous": parse_trous}
+
+
+def parse_revision(revision_type: str, content: str) -> Optional[dict]:
+    parser = PARSERS.get(revision_type)
+    return parser(content) if parser else None
+
+
+def public_view(structured: dict) -> dict:
+    """The structure without answer keys."""
+    if structured["kind"] == "qcm":
+        return {"kind": "qcm", "questions": [
+            {"question": q["question"], "choices": q["choices"]} for q in structured["questions"]
+        ]}
+    if structured["kind"] == "trous":
+        return {"kind": "trous", "text": structured["text"], "gaps": len(structured["answers"]),
+                "word_bank": structured["word_bank"]}
+    return structured
+
+
+def _normalize_word(value: str) -> str:
+    return fold(value).strip(" .!?;:'\"«»")
+
+
+def grade(structured: dict, answers: Dict[int, str]) -> dict:
+    """Grade `answers` (question or gap index -> letter or word)."""
+    results = []
+    if structured["kind"] == "qcm":
+        for index, question in enumerate(structured["questions"]):
+            given = answers.get(index)
+            expected = question["answer"]
+            choice = ord(given.strip().upper()) - ord("A") if given and len(given.strip()) == 1 else None
+            results.append({
+                "correct": expected is not None and choice == expected,
+                "expected": chr(ord("A") + expected) if expected is not None else None,
+                "explanation": question["explanation"],
+            })
+    else:
+        for index, expected in enumerate(structured["answers"]):
+            given = answers.get(index)
+            results.append({
+                "correct": expected is not None and given is not None
+                and _normalize_word(given) == _normalize_word(expected),
+                "expected": expected,
+            })
+    return {
+        "score": sum(result["correct"] for result in results),
+        "total": len(results),
+        "results": results,
+    }
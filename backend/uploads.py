@@ -0,0 +1,67 @@
+from typing import Collection
+
+from starlette.responses import JSONResponse
+
+
+class BodyTooLarge(Exception):
+    """Raised from `receive` once a request body passes its limit."""
+
+
+class BodyLimitMiddleware:
+    """ASGI middleware capping request bodies on `paths` at `max_bytes`.
+
+    Content-Length is checked up front, but chunked requests carry none: the
+    bytes are also counted as they are received, so Starlette never spools
+    more than the cap to disk. Whatever the app answers once the limit is
+    hit (FastAPI turns the error into a 400 body-parsing failure) is
+    replaced by a 413.
+    """
+
+    def __init__(self, app, paths: Collection[str], max_bytes: int, detail: str = "Requête trop volumineuse"):
+        self.app = app
+        self.paths = paths
+        self.max_bytes = max_bytes
+        self.detail = detail
+
+    def _too_large(self) -> JSONResponse:
+        return JSONResponse(status_code=413, content={"detail": self.detail})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._too_large()(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if exceeded:
+                # Drop the app's own error response, the 413 is sent instead
+                return
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except BodyTooLarge:
+            pass
+        if exceeded and not started:
+            await self._too_large()(scope, receive, send)
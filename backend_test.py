@@ -245,9 +245,9 @@ class GoyadRevisionAPITester:
         headers = {'Authorization': f'Bearer {self.token}'}
         result = self.run_test("Get Revisions", "GET", "revisions", 200, headers=headers)
         
-        if result and isinstance(result, list):
-            self.log_test("Revisions List Received", True, f"Found {len(result)} revisions")
-            return result
+        if result and isinstance(result.get("items"), list):
+            self.log_test("Revisions List Received", True, f"Found {len(result['items'])} revisions")
+            return result["items"]
         return None
 
     def test_delete_revision(self):
@@ -0,0 +1,111 @@
+"""Throughput of bulk revision import/delete against the single-item endpoints.
+
+A fresh user saves --count revisions one POST /api/revisions at a time
+(--concurrency requests in flight), then deletes them the same way. The
+same revisions then go through POST /api/revisions/bulk and
+/api/revisions/bulk-delete in requests of --bulk-size items. Rate limits
+on the single-item routes apply as deployed; run against a server with
+generous AUTH/LLM limits if they get in the way.
+
+Usage: python benchmarks/bulk_revisions.py [--base-url http://localhost:8001] [--count 1000]
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import httpx
+
+SUBJECTS = ["maths", "francais", "histoire-geo", "svt", "physique-chimie"]
+TYPES = ["fiche", "qcm", "flashcard", "resume", "trous"]
+
+
+def revisions(count, seed=3):
+    rng = random.Random(seed)
+    return [
+        {
+            "prompt": f"Chapitre {i}",
+            "subject": rng.choice(SUBJECTS),
+            "revision_type": rng.choice(TYPES),
+            # A tenth of the bodies repeat, as shared generations do
+            "content": f"# Fiche {rng.randrange(count // 10) if rng.random() < 0.1 else i}\n\n" + "- point clé\n" * 40,
+        }
+        for i in range(count)
+    ]
+
+
+async def bounded(concurrency, calls):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(call):
+        async with semaphore:
+            return await call()
+
+    return await asyncio.gather(*[run(call) for call in calls])
+
+
+async def single(client, headers, items, concurrency):
+    async def save(item):
+        response = await client.post("/api/revisions", json=item, headers=headers)
+        response.raise_for_status()
+        return response.json()["id"]
+
+    started = time.perf_counter()
+    ids = await bounded(concurrency, [lambda item=item: save(item) for item in items])
+    saved = time.perf_counter() - started
+
+    async def delete(revision_id):
+        (await client.delete(f"/api/revisions/{revision_id}", headers=headers)).raise_for_status()
+
+    started = time.perf_counter()
+    await bounded(concurrency, [lambda revision_id=revision_id: delete(revision_id) for revision_id in ids])
+    return saved, time.perf_counter() - started
+
+
+async def bulk(client, headers, items, size):
+    ids = []
+    started = time.perf_counter()
+    for start in range(0, len(items), size):
+        response = await client.post("/api/revisions/bulk", json={"revisions": items[start:start + size]}, headers=headers)
+        response.raise_for_status()
+        ids += [result["id"] for result in response.json()["results"] if result["id"]]
+    saved = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for start in range(0, len(ids), size):
+        response = await client.post("/api/revisions/bulk-delete", json={"ids": ids[start:start + size]}, headers=headers)
+        response.raise_for_status()
+    return saved, time.perf_counter() - started
+
+
+def report(name, count, elapsed):
+    print(f"{name:<20} {count} in {elapsed:6.2f}s  ({count / elapsed:8.1f} revisions/s)")
+
+
+async def main(base_url, count, concurrency, bulk_size):
+    credentials = {"email": f"bench_{uuid.uuid4().hex[:8]}@example.com", "password": "Bench123!"}
+    items = revisions(count)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        response = await client.post("/api/auth/register", json={**credentials, "name": "Bench"})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+
+        saved, deleted = await single(client, headers, items, concurrency)
+        report("single save", count, saved)
+        report("single delete", count, deleted)
+
+        bulk_saved, bulk_deleted = await bulk(client, headers, items, bulk_size)
+        report(f"bulk save ({bulk_size})", count, bulk_saved)
+        report(f"bulk delete ({bulk_size})", count, bulk_deleted)
+        print(f"speedup: save x{saved / bulk_saved:.1f}, delete x{deleted / bulk_deleted:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8, help="single-item requests in flight")
+    parser.add_argument("--bulk-size", type=int, default=500, help="revisions per bulk request")
+    args = parser.parse_args()
+    asyncio.run(main(args.base_url, args.count, args.concurrency, args.bulk_size))
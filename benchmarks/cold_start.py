@@ -0,0 +1,83 @@
+"""Measure cold-start time from process launch to the first successful /api/generate.
+
+Starts `uvicorn server:app` from backend/ with the current environment
+(MONGO_URL, EMERGENT_LLM_KEY, ...), then records when the liveness probe
+first answers, when the readiness probe first returns 200 and how long the
+first generation takes once it does. With --no-wait-ready the generation is
+sent as soon as the process is live, which is what a load balancer without a
+readiness check would do.
+
+Usage: python benchmarks/cold_start.py [--runs 3] [--port 8011] [--no-wait-ready]
+"""
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+
+
+def wait_for(client, url, deadline, ok=(200,)):
+    """Poll `url` until it answers with a status in `ok`, return the time it first did"""
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(url).status_code in ok:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.02)
+    raise TimeoutError(f"{url} did not answer in time")
+
+
+def cold_start(args):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(args.port)],
+        cwd=BACKEND, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    launched = time.perf_counter()
+    deadline = launched + args.timeout
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=args.timeout) as client:
+            live = wait_for(client, "/api/health/live", deadline)
+            ready = wait_for(client, "/api/health/ready", deadline) if args.wait_ready else None
+            sent = time.perf_counter()
+            response = client.post("/api/generate", json={
+                "prompt": f"Le théorème de Pythagore ({launched})",
+                "subject": "maths",
+                "revision_type": "fiche",
+                "allow_similar": False,
+            })
+            done = time.perf_counter()
+            response.raise_for_status()
+    finally:
+        process.terminate()
+        process.wait()
+    return {
+        "live": live - launched,
+        "ready": ready - launched if ready else None,
+        "generate": done - sent,
+        "total": done - launched,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--no-wait-ready", dest="wait_ready", action="store_false",
+                        help="send the generation as soon as the liveness probe answers")
+    args = parser.parse_args()
+
+    for run in range(1, args.runs + 1):
+        result = cold_start(args)
+        ready = f"{result['ready']:.2f}s" if result["ready"] is not None else "-"
+        print(f"run {run}: live={result['live']:.2f}s ready={ready} "
+              f"first generate={result['generate']:.2f}s total={result['total']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""Offline load test of the FastAPI app with local LLM and Mongo stand-ins.
+
+The app runs in-process behind httpx's ASGI transport. LlmChat is replaced
+by a fake with configurable latency, and Mongo by mongomock-motor unless
+--mongo-url points at a real server. A mixed workload
+(register/login/generate/save/list/get) is driven by asyncio virtual users.
+RPS, p50/p95/p99 per operation and event-loop lag are printed and saved as
+JSON so runs can be compared across commits.
+
+Usage:
+    python benchmarks/load_test.py --duration 20 --users 50
+    python benchmarks/load_test.py --compare benchmarks/results/<previous>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import types
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+WORKLOAD = {"register": 2, "login": 8, "generate": 25, "save": 15, "list": 40, "get": 10}
+
+SAMPLE_CONTENT = "# ✨ Fiche de révision\n\n" + "\n\n".join(
+    f"## Partie {i}\n\n- **Notion clé** : définition simple et exemple concret." for i in range(1, 9)
+)
+
+
+def install_fake_llm(latency: float, jitter: float, error_rate: float, chunks: int):
+    """Register a fake `emergentintegrations.llm.chat` module before the app imports it."""
+
+    class ImageContent:
+        def __init__(self, image_base64):
+            self.image_base64 = image_base64
+
+    class UserMessage:
+        def __init__(self, text, file_contents=None):
+            self.text = text
+            self.file_contents = file_contents or []
+
+    class LlmChat:
+        def __init__(self, api_key, session_id, system_message):
+            self.system_message = system_message
+
+        def with_model(self, provider, model):
+            return self
+
+        async def stream_message(self, message):
+            # Output delivered in `chunks` pieces spread over the latency
+            delay = max(0.0, random.gauss(latency, jitter)) / chunks
+            if random.random() < error_rate:
+                raise RuntimeError("fake upstream error")
+            for i in range(chunks):
+                await asyncio.sleep(delay)
+                yield f"{SAMPLE_CONTENT}\n\n" if i == 0 else f"Suite {i} pour {message.text[:40]}\n\n"
+
+        async def send_message(self, message):
+            return "".join([chunk async for chunk in self.stream_message(message)])
+
+    chat = types.ModuleType("emergentintegrations.llm.chat")
+    chat.LlmChat, chat.UserMessage, chat.ImageContent = LlmChat, UserMessage, ImageContent
+    package = types.ModuleType("emergentintegrations")
+    llm = types.ModuleType("emergentintegrations.llm")
+    package.llm, llm.chat = llm, chat
+    sys.modules.update({
+        "emergentintegrations": package,
+        "emergentintegrations.llm": llm,
+        "emergentintegrations.llm.chat": chat,
+    })
+
+
+def load_app(args):
+    os.environ.setdefault("EMERGENT_LLM_KEY", "load-test")
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    if not args.rate_limits:
+        # Every virtual user shares one client IP; measure capacity, not the limiter
+        for name in ("LLM_RATE_PER_MINUTE", "LLM_BURST", "AUTH_RATE_PER_MINUTE", "AUTH_BURST"):
+            os.environ[name] = "1000000"
+    install_fake_llm(args.llm_latency, args.llm_jitter, args.llm_error_rate, args.llm_chunks)
+    if args.mongo_url:
+        os.environ["MONGO_URL"] = args.mongo_url
+        os.environ["DB_NAME"] = f"load_test_{uuid.uuid4().hex[:8]}"
+    else:
+        try:
+            import mongomock_motor
+        except ImportError:
+            sys.exit("mongomock-motor is required without --mongo-url (pip install mongomock-motor)")
+        import motor.motor_asyncio
+        motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+    import server
+    return server
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class VirtualUser:
+    def __init__(self, client, prompts, stats):
+        self.client = client
+        self.prompts = prompts
+        self.stats = stats
+        self.email = f"load_{uuid.uuid4().hex[:12]}@example.com"
+        self.password = "LoadTest123!"
+        self.headers = {}
+        self.revision_ids = []
+
+    async def call(self, op, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except Exception:
+            response, ok = None, False
+        self.stats.setdefault(op, {"latencies": [], "errors": 0})
+        self.stats[op]["latencies"].append(time.perf_counter() - start)
+        if not ok:
+            self.stats[op]["errors"] += 1
+        return response if ok else None
+
+    async def register(self):
+        self.email = f"load_{uuid.uuid4().hex[:12]}@example.com"
+        response = await self.call("register", "POST", "/api/auth/register",
+                                   json={"email": self.email, "password": self.password, "name": "Load"})
+        if response is not None:
+            self.headers = {"Authorization": f"Bearer {response.json()['token']}"}
+            self.revision_ids = []
+
+    async def login(self):
+        response = await self.call("login", "POST", "/api/auth/login",
+                                   json={"email": self.email, "password": self.password})
+        if response is not None:
+            self.headers = {"Authorization": f"Bearer {response.json()['token']}"}
+
+    async def generate(self):
+        subject, revision_type, prompt = random.choice(self.prompts)
+        await self.call("generate", "POST", "/api/generate", headers=self.headers,
+                        json={"prompt": prompt, "subject": subject, "revision_type": revision_type})
+
+    async def save(self):
+        subject, revision_type, prompt = random.choice(self.prompts)
+        response = await self.call("save", "POST", "/api/revisions", headers=self.headers, json={
+            "prompt": prompt, "subject": subject, "revision_type": revision_type, "content": SAMPLE_CONTENT
+        })
+        if response is not None:
+            self.revision_ids.append(response.json()["id"])
+
+    async def list(self):
+        await self.call("list", "GET", "/api/revisions", headers=self.headers)
+
+    async def get(self):
+        if self.revision_ids:
+            await self.call("get", "GET", f"/api/revisions/{random.choice(self.revision_ids)}", headers=self.headers)
+
+    async def run(self, deadline):
+        await self.register()
+        ops, weights = zip(*WORKLOAD.items())
+        while time.perf_counter() < deadline:
+            await getattr(self, random.choices(ops, weights)[0])()
+
+
+async def measure_loop_lag(stop, samples, interval=0.01):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - start - interval))
+
+
+async def run(args):
+    import httpx
+    server = load_app(args)
+    random.seed(args.seed)
+    subjects = ["maths", "francais", "histoire-geo", "svt", "physique-chimie"]
+    types_ = ["fiche", "qcm", "flashcard", "resume", "trous"]
+    prompts = [(random.choice(subjects), random.choice(types_), f"Chapitre {i}") for i in range(args.distinct_prompts)]
+
+    stats, lag = {}, []
+    async with server.app.router.lifespan_context(server.app):
+        while not server.app.state.ready:
+            await asyncio.sleep(0.05)
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=120) as client:
+            stop = asyncio.Event()
+            monitor = asyncio.create_task(measure_loop_lag(stop, lag))
+            started = time.perf_counter()
+            deadline = started + args.duration
+            await asyncio.gather(*[VirtualUser(client, prompts, stats).run(deadline) for _ in range(args.users)])
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await monitor
+    return summarize(args, stats, lag, elapsed)
+
+
+def summarize(args, stats, lag, elapsed):
+    def describe(latencies, errors=0):
+        return {
+            "count": len(latencies),
+            "errors": errors,
+            "rps": len(latencies) / elapsed,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+        }
+    all_latencies = [value for op in stats.values() for value in op["latencies"]]
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "date": datetime.now(timezone.utc).isoformat(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "elapsed_s": elapsed,
+        "total": describe(all_latencies, sum(op["errors"] for op in stats.values())),
+        "operations": {name: describe(op["latencies"], op["errors"]) for name, op in sorted(stats.items())},
+        "event_loop_lag_ms": {
+            "p50": percentile(lag, 50) * 1000,
+            "p99": percentile(lag, 99) * 1000,
+            "max": max(lag, default=0) * 1000,
+        },
+    }
+
+
+def report(result, baseline=None):
+    print(f"commit {result['commit']}  {result['elapsed_s']:.1f}s  users={result['config']['users']}")
+    print(f"{'operation':<10} {'count':>7} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    rows = list(result["operations"].items()) + [("total", result["total"])]
+    for name, row in rows:
+        line = (f"{name:<10} {row['count']:>7} {row['errors']:>5} {row['rps']:>8.1f} "
+                f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+        previous = (baseline or {}).get("operations", {}).get(name) or (
+            baseline.get("total") if baseline and name == "total" else None)
+        if previous:
+            line += f"   rps {row['rps'] - previous['rps']:+.1f}  p99 {row['p99_ms'] - previous['p99_ms']:+.1f}ms"
+        print(line)
+    lag = result["event_loop_lag_ms"]
+    print(f"event loop lag: p50={lag['p50']:.2f}ms p99={lag['p99']:.2f}ms max={lag['max']:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--distinct-prompts", type=int, default=200, help="lower values raise the cache hit rate")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="mean fake LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.3)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-chunks", type=int, default=8, help="pieces the fake LLM streams its answer in")
+    parser.add_argument("--bcrypt-rounds", type=int, default=10)
+    parser.add_argument("--rate-limits", action="store_true", help="keep the configured admission limits")
+    parser.add_argument("--mongo-url", help="real MongoDB to use instead of mongomock (a scratch DB is created)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="JSON result path (default: benchmarks/results/<date>-<commit>.json)")
+    parser.add_argument("--compare", help="previous JSON result to diff against")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    report(result, baseline)
+
+    output = Path(args.output) if args.output else (
+        ROOT / "benchmarks" / "results" / f"{datetime.now():%Y%m%d-%H%M%S}-{result['commit'] or 'local'}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print(f"saved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Measure /api/subjects latency while /api/auth/login is hammered.
+
+With bcrypt running on the event loop, every login stalls all other
+requests for the duration of a hash; the p99 of the cheap catalog route
+then jumps by hundreds of milliseconds. With hashing offloaded it should
+stay flat.
+
+Usage: python benchmarks/login_contention.py [--base-url http://localhost:8001]
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def probe(client, duration):
+    """Hit /api/subjects sequentially for `duration` seconds, return latencies in ms"""
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.get("/api/subjects")
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+async def hammer_logins(client, credentials, stop):
+    count = 0
+    while not stop.is_set():
+        await client.post("/api/auth/login", json=credentials)
+        count += 1
+    return count
+
+
+def report(name, latencies):
+    print(f"{name:<22} n={len(latencies):<5} p50={percentile(latencies, 50):7.1f}ms "
+          f"p99={percentile(latencies, 99):7.1f}ms max={max(latencies):7.1f}ms")
+
+
+async def main(base_url, duration, concurrency):
+    credentials = {"email": f"bench_{uuid.uuid4().hex[:8]}@example.com", "password": "Bench123!"}
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        response = await client.post("/api/auth/register", json={**credentials, "name": "Bench"})
+        response.raise_for_status()
+
+        report("idle", await probe(client, duration))
+
+        stop = asyncio.Event()
+        hammers = [asyncio.create_task(hammer_logins(client, credentials, stop)) for _ in range(concurrency)]
+        latencies = await probe(client, duration)
+        stop.set()
+        logins = sum(await asyncio.gather(*hammers))
+        report(f"{concurrency} login loops", latencies)
+        print(f"logins completed: {logins} ({logins / duration:.1f}/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.base_url, args.duration, args.concurrency))
@@ -0,0 +1,117 @@
+"""Storage ratio and encode/decode cost of revision content compression.
+
+Compares plain zstd with per-revision_type trained dictionaries, on a
+synthetic corpus shaped like the generated fiches, QCMs and flashcards, or
+on the stored revision blobs of a database with --mongo.
+
+Usage: python benchmarks/revision_compression.py [--docs 2000] [--mongo]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import zstandard  # noqa: E402
+
+from compression import ContentCodec  # noqa: E402
+
+WORDS = ("triangle hypoténuse théorème angle droit carré côté longueur Révolution roi peuple "
+         "cellule noyau ADN volcan magma plaque énergie tension circuit verbe sujet complément "
+         "démocratie citoyen vote Europe frontière climat").split()
+
+
+def sentence(rng, n=12):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def fake_qcm(rng):
+    lines = ["# 📝 QCM de révision", ""]
+    for i in range(1, 11):
+        lines += [f"### Question {i}", sentence(rng) + " ?", ""]
+        lines += [f"- **{letter})** {sentence(rng, 5)}" for letter in "ABCD"]
+        lines += ["", f"✅ **Réponse : {rng.choice('ABCD')}** — {sentence(rng)}", ""]
+    lines += ["## 🎯 Réponses correctes", ", ".join(f"{i}-{rng.choice('ABCD')}" for i in range(1, 11))]
+    return "\n".join(lines)
+
+
+def fake_flashcards(rng):
+    cards = []
+    for i in range(1, 11):
+        cards.append(f"### 🃏 Carte {i}\n\n**RECTO :** {sentence(rng, 6)} ?\n\n**VERSO :** {sentence(rng)}")
+    return "# Flashcards\n\n" + "\n\n---\n\n".join(cards)
+
+
+def fake_fiche(rng):
+    sections = []
+    for title in ("📌 Les notions clés", "📖 Définitions", "💡 Exemples", "🧠 Astuces pour retenir"):
+        sections.append(f"## {title}\n\n" + "\n".join(f"- **{rng.choice(WORDS)}** : {sentence(rng)}" for _ in range(5)))
+    return f"# ✨ {sentence(rng, 4)}\n\n" + "\n\n".join(sections)
+
+
+GENERATORS = {"qcm": fake_qcm, "flashcard": fake_flashcards, "fiche": fake_fiche}
+
+
+def synthetic_corpus(docs):
+    rng = random.Random(42)
+    return {revision_type: [generate(rng) for _ in range(docs)] for revision_type, generate in GENERATORS.items()}
+
+
+async def mongo_corpus(docs):
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+    load_dotenv(Path(__file__).resolve().parent.parent / "backend" / ".env")
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    db = client[os.environ.get("DB_NAME", "test_database")]
+    codec = ContentCodec(db.compression_dicts)
+    await codec.load()
+    corpus = {}
+    for revision_type in await db.revision_blobs.distinct("revision_type"):
+        cursor = db.revision_blobs.find({"revision_type": revision_type}, {"_id": 0}).limit(docs)
+        corpus[revision_type] = [codec.decode(doc)["content"] async for doc in cursor]
+    client.close()
+    return corpus
+
+
+def measure(codec, revision_type, contents):
+    raw = sum(len(c.encode("utf-8")) for c in contents)
+    start = time.perf_counter()
+    encoded = [codec.compress(c, revision_type) for c in contents]
+    encode_us = (time.perf_counter() - start) / len(contents) * 1e6
+    start = time.perf_counter()
+    for data, dict_id in encoded:
+        codec.decompress(data, dict_id)
+    decode_us = (time.perf_counter() - start) / len(contents) * 1e6
+    stored = sum(len(data) for data, _ in encoded)
+    return raw, stored, encode_us, decode_us
+
+
+def main(args):
+    corpus = asyncio.run(mongo_corpus(args.docs)) if args.mongo else synthetic_corpus(args.docs)
+    print(f"{'type':<10} {'mode':<6} {'docs':>6} {'raw KiB':>9} {'stored KiB':>11} {'ratio':>6} {'enc µs':>8} {'dec µs':>8}")
+    for revision_type, contents in corpus.items():
+        if len(contents) < 40:
+            continue
+        # Train on the first half, measure on the second half
+        train, test = contents[: len(contents) // 2], contents[len(contents) // 2:]
+        plain = ContentCodec(None, level=args.level)
+        trained = ContentCodec(None, level=args.level)
+        dictionary = zstandard.train_dictionary(args.dict_size, [c.encode("utf-8") for c in train])
+        trained.add_dictionary(dictionary.dict_id(), revision_type, dictionary.as_bytes())
+        for mode, codec in (("plain", plain), ("dict", trained)):
+            raw, stored, encode_us, decode_us = measure(codec, revision_type, test)
+            print(f"{revision_type:<10} {mode:<6} {len(test):>6} {raw / 1024:>9.1f} {stored / 1024:>11.1f} "
+                  f"{raw / stored:>6.2f} {encode_us:>8.1f} {decode_us:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=2000, help="documents per revision_type")
+    parser.add_argument("--level", type=int, default=9)
+    parser.add_argument("--dict-size", type=int, default=16 * 1024)
+    parser.add_argument("--mongo", action="store_true", help="use the revisions stored in MONGO_URL")
+    main(parser.parse_args())
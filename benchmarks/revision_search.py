@@ -0,0 +1,168 @@
+"""Latency of revision search at 10k and 100k saved revisions.
+
+A synthetic corpus with a Zipf-like vocabulary is indexed for a single
+user (the worst case: every revision is a potential candidate). Offline,
+the benchmark measures indexing and the in-process ranking of the
+candidates Mongo would return. With --mongo-url, the revisions and their
+content blobs are inserted into a scratch database and the whole query
+(blob lookup, indexed fetch, count and ranking) is timed as the endpoint
+runs it.
+
+Usage: python benchmarks/revision_search.py [--sizes 10000 100000] [--mongo-url mongodb://localhost:27017]
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from search import combine, content_fields, query_terms, rank, stats_projection, title_fields  # noqa: E402
+
+TOPICS = ("théorème Pythagore triangle rectangle hypoténuse fractions équations proportionnalité "
+          "Révolution française Première Guerre mondiale Seconde Guerre mondiale démocratie citoyenneté "
+          "cellule ADN génétique volcan séisme plaques énergie électricité circuit tension "
+          "subjonctif passé simple conjugaison poésie argumentation").split()
+SUBJECTS = ["maths", "francais", "histoire-geo", "svt", "physique-chimie", "anglais"]
+TYPES = ["fiche", "qcm", "flashcard", "resume", "trous"]
+QUERIES = [
+    "théorème de Pythagore", "fractions", "Révolution française", "guerre mondiale", "cellule ADN",
+    "électricité tension", "subjonctif", "volcan", "démocratie citoyenneté", "équations",
+    "mot0001", "mot0150 mot0900", "mot4000", "poésie argumentation", "plaques séisme",
+]
+# SEARCH_MAX_CANDIDATES and SEARCH_MAX_BLOBS defaults of server.py
+MAX_CANDIDATES = 1000
+MAX_BLOBS = 5000
+SUMMARY_PROJECTION = {"_id": 0, "id": 1, "user_id": 1, "prompt": 1, "subject": 1, "revision_type": 1, "created_at": 1}
+
+
+def corpus(size, seed=7):
+    rng = random.Random(seed)
+    vocabulary = [f"mot{i:04d}" for i in range(5000)] + TOPICS
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    rng.shuffle(weights)
+    for i in range(size):
+        topic = " ".join(rng.sample(TOPICS, 2))
+        words = rng.choices(vocabulary, weights, k=rng.randint(150, 400))
+        yield {
+            "id": str(uuid.uuid4()),
+            "user_id": "bench",
+            "prompt": topic,
+            "subject": rng.choice(SUBJECTS),
+            "revision_type": rng.choice(TYPES),
+            "content": " ".join(words),
+            "created_at": f"2026-01-01T00:00:{i:09d}",
+        }
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(label, samples):
+    print(f"  {label:<28} p50 {percentile(samples, 50) * 1000:8.2f} ms   p99 {percentile(samples, 99) * 1000:8.2f} ms")
+
+
+def offline(size):
+    queries = {query: query_terms(query) for query in QUERIES}
+    candidates = {query: [] for query in queries}
+    start = time.perf_counter()
+    for doc in corpus(size):
+        fields = combine(title_fields(doc["prompt"], doc["subject"]), content_fields(doc.pop("content")))
+        # Keep what the indexed find would return for each benchmark query
+        for query, terms in queries.items():
+            if any(term in fields["search_tf"] for term in terms):
+                projected = {key: doc[key] for key in SUMMARY_PROJECTION if key in doc}
+                projected["search_len"] = fields["search_len"]
+                projected["search_tf"] = {t: fields["search_tf"][t] for t in terms if t in fields["search_tf"]}
+                candidates[query].append(projected)
+    elapsed = time.perf_counter() - start
+    print(f"  indexing                     {elapsed / size * 1e6:8.1f} us/revision")
+
+    samples = []
+    for _ in range(5):
+        for query, terms in queries.items():
+            docs = [dict(doc, search_tf=dict(doc["search_tf"])) for doc in candidates[query]]
+            start = time.perf_counter()
+            rank(docs, terms, size, top=20)
+            samples.append(time.perf_counter() - start)
+    report("ranking (first page)", samples)
+    counts = sorted(len(docs) for docs in candidates.values())
+    print(f"  candidates per query         median {counts[len(counts) // 2]}, max {counts[-1]}")
+
+
+async def with_mongo(size, mongo_url):
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from indexes import ensure_indexes
+
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[f"search_bench_{uuid.uuid4().hex[:8]}"]
+    try:
+        await ensure_indexes(db)
+        revisions, blobs = [], []
+        for doc in corpus(size):
+            # Every revision has its own content here: the worst case for blob lookups
+            doc["content_hash"] = uuid.uuid4().hex
+            blobs.append({"_id": doc["content_hash"], **content_fields(doc.pop("content"))})
+            revisions.append({**doc, **title_fields(doc["prompt"], doc["subject"])})
+            if len(revisions) == 1000:
+                await db.revisions.insert_many(revisions)
+                await db.revision_blobs.insert_many(blobs)
+                revisions, blobs = [], []
+        if revisions:
+            await db.revisions.insert_many(revisions)
+            await db.revision_blobs.insert_many(blobs)
+
+        samples, filtered = [], []
+        for _ in range(3):
+            for query in QUERIES:
+                terms = query_terms(query)
+                for subject, bucket in ((None, samples), ("maths", filtered)):
+                    start = time.perf_counter()
+                    hashes = [blob["_id"] for blob in await db.revision_blobs.find(
+                        {"search_terms": {"$in": terms}}, {"_id": 1}
+                    ).to_list(MAX_BLOBS)]
+                    mongo_query = {"user_id": "bench", "$or": [
+                        {"search_terms": {"$in": terms}}, {"content_hash": {"$in": hashes}}
+                    ]}
+                    if subject:
+                        mongo_query["subject"] = subject
+                    projection = stats_projection(terms, {**SUMMARY_PROJECTION, "content_hash": 1, "search_v": 1})
+                    docs = await db.revisions.find(mongo_query, projection).sort(
+                        [("created_at", -1), ("id", -1)]
+                    ).to_list(MAX_CANDIDATES)
+                    matching = {
+                        blob["_id"]: blob for blob in await db.revision_blobs.find(
+                            {"_id": {"$in": [doc.get("content_hash") for doc in docs]}, "search_terms": {"$in": terms}},
+                            stats_projection(terms, {})
+                        ).to_list(None)
+                    }
+                    docs = [combine(doc, matching.get(doc.get("content_hash"))) for doc in docs]
+                    total = await db.revisions.count_documents({"user_id": "bench"})
+                    rank(docs, terms, total, top=20)
+                    bucket.append(time.perf_counter() - start)
+        report("search (Mongo + ranking)", samples)
+        report("search, subject filter", filtered)
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--mongo-url", help="time complete searches against this MongoDB (a scratch DB is created)")
+    args = parser.parse_args()
+    for size in args.sizes:
+        print(f"{size} revisions")
+        offline(size)
+        if args.mongo_url:
+            asyncio.run(with_mongo(size, args.mongo_url))
+
+
+if __name__ == "__main__":
+    main()
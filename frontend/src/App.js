@@ -478,7 +478,7 @@ const GeneratorPage = () => {
     }
   };
 
-  const handleGenerate = async () => {
+  const handleGenerate = async (allowSimilar = true) => {
     if (!selectedSubject || !selectedType || !prompt.trim()) {
       toast.error("Remplis tous les champs requis");
       return;
@@ -497,11 +497,18 @@ const GeneratorPage = () => {
         prompt,
         subject: selectedSubject,
         revision_type: selectedType,
-        image_base64: imageBase64
+        image_base64: imageBase64,
+        allow_similar: allowSimilar
       }, { headers });
 
       setResult(res.data);
-      toast.success("Révision générée avec succès !");
+      if (res.data.similar_prompt) {
+        toast.success(`Révision trouvée pour un sujet proche : « ${res.data.similar_prompt} »`, {
+          action: { label: "Régénérer", onClick: () => handleGenerate(false) }
+        });
+      } else {
+        toast.success("Révision générée avec succès !");
+      }
     } catch (e) {
       console.error(e);
       toast.error(e.response?.data?.detail || "Erreur lors de la génération");
@@ -516,15 +523,20 @@ const GeneratorPage = () => {
       return;
     }
 
+    const headers = { Authorization: `Bearer ${getToken()}` };
     try {
-      await axios.post(`${API}/revisions`, {
-        prompt: result.prompt,
-        subject: result.subject,
-        revision_type: result.revision_type,
-        content: result.content
-      }, {
-        headers: { Authorization: `Bearer ${getToken()}` }
-      });
+      try {
+        // The server keeps recent generations, no need to upload the content again
+        await axios.post(`${API}/revisions/from-generation/${result.id}`, null, { headers });
+      } catch (e) {
+        if (e.response?.status !== 404) throw e;
+        await axios.post(`${API}/revisions`, {
+          prompt: result.prompt,
+          subject: result.subject,
+          revision_type: result.revision_type,
+          content: result.content
+        }, { headers });
+      }
       toast.success("Révision sauvegardée !");
     } catch (e) {
       toast.error("Erreur lors de la sauvegarde");
@@ -632,7 +644,7 @@ const GeneratorPage = () => {
 
               {/* Generate Button */}
               <Button
-                onClick={handleGenerate}
+                onClick={() => handleGenerate()}
                 disabled={loading || !selectedSubject || !selectedType || !prompt.trim()}
                 className="neo-btn-primary w-full text-lg disabled:opacity-50"
                 data-testid="generate-btn"
@@ -738,6 +750,7 @@ const DashboardPage = () => {
   const [revisions, setRevisions] = useState([]);
   const [loading, setLoading] = useState(true);
   const [selectedRevision, setSelectedRevision] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
     if (!user) {
@@ -747,12 +760,14 @@ const DashboardPage = () => {
     fetchRevisions();
   }, [user, navigate]);
 
-  const fetchRevisions = async () => {
+  const fetchRevisions = async (cursor = null) => {
     try {
       const res = await axios.get(`${API}/revisions`, {
-        headers: { Authorization: `Bearer ${getToken()}` }
+        headers: { Authorization: `Bearer ${getToken()}` },
+        params: cursor ? { cursor } : {}
       });
-      setRevisions(res.data);
+      setRevisions(prev => cursor ? [...prev, ...res.data.items] : res.data.items);
+      setNextCursor(res.data.next_cursor);
     } catch (e) {
       console.error(e);
     } finally {
@@ -760,6 +775,17 @@ const DashboardPage = () => {
     }
   };
 
+  const handleSelect = async (revision) => {
+    try {
+      const res = await axios.get(`${API}/revisions/${revision.id}`, {
+        headers: { Authorization: `Bearer ${getToken()}` }
+      });
+      setSelectedRevision(res.data);
+    } catch (e) {
+      toast.error("Erreur lors du chargement");
+    }
+  };
+
   const handleDelete = async (id) => {
     try {
       await axios.delete(`${API}/revisions/${id}`, {
@@ -838,7 +864,7 @@ const DashboardPage = () => {
               {revisions.map((revision) => (
                 <div
                   key={revision.id}
-                  onClick={() => setSelectedRevision(revision)}
+                  onClick={() => handleSelect(revision)}
                   className={`neo-card-hover cursor-pointer ${selectedRevision?.id === revision.id ? "ring-2 ring-primary" : ""}`}
                   data-testid={`revision-card-${revision.id}`}
                 >
@@ -867,6 +893,11 @@ const DashboardPage = () => {
                   </div>
                 </div>
               ))}
+              {nextCursor && (
+                <Button onClick={() => fetchRevisions(nextCursor)} variant="outline" className="w-full border-2 border-black" data-testid="load-more-btn">
+                  Charger plus
+                </Button>
+              )}
             </div>
 
             {/* Revision Content */}
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import sys
+import types
+import uuid
+from pathlib import Path
+
+import pytest
+
+# The backend modules import each other as top-level modules, as uvicorn runs them
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+@pytest.fixture(scope="session")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def server(loop):
+    """The API module on mongomock with its indexes, without the lifespan (no warm-up, no workers)."""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import motor.motor_asyncio
+
+    os.environ.update(EMERGENT_LLM_KEY="test", JWT_SECRET="test-secret-" + "x" * 32, BCRYPT_ROUNDS="4", AUTH_RATE_PER_MINUTE="1000000", AUTH_BURST="1000000")
+    motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+    import server
+    server.app.state.ready = True
+    server.app.state.warm_up = {}
+    server.app.state.index_errors = loop.run_until_complete(server.ensure_indexes(server.db))
+    return server
+
+
+@pytest.fixture
+def api(server, loop):
+    """Call `api(method, url, **kwargs)` as a freshly registered user."""
+    import httpx
+
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test")
+    registered = loop.run_until_complete(client.post("/api/auth/register", json={
+        "email": f"test_{uuid.uuid4().hex[:8]}@example.com", "password": "Test123!", "name": "Test"
+    }))
+    client.headers["Authorization"] = f"Bearer {registered.json()['token']}"
+
+    def call(method, url, **kwargs):
+        return loop.run_until_complete(client.request(method, url, **kwargs))
+
+    yield call
+    loop.run_until_complete(client.aclose())
+
+
+@pytest.fixture
+def answers(monkeypatch):
+    """model -> (delay, answer or exception) for a stand-in LlmChat; the None entry answers for any model."""
+    behaviour = {None: (0, "# Fiche\n\n- point clé")}
+
+    class UserMessage:
+        def __init__(self, text, file_contents=None):
+            self.text = text
+            self.file_contents = file_contents or []
+
+    class ImageContent:
+        def __init__(self, image_base64):
+            self.image_base64 = image_base64
+
+    class LlmChat:
+        def __init__(self, api_key, session_id, system_message):
+            pass
+
+        def with_model(self, provider, model):
+            self.model = model
+            return self
+
+        async def send_message(self, message):
+            delay, outcome = behaviour.get(self.model, behaviour[None])
+            await asyncio.sleep(delay)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+    chat = types.ModuleType("emergentintegrations.llm.chat")
+    chat.LlmChat, chat.UserMessage, chat.ImageContent = LlmChat, UserMessage, ImageContent
+    monkeypatch.setitem(sys.modules, "emergentintegrations.llm.chat", chat)
+    return behaviour
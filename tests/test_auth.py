@@ -0,0 +1,24 @@
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_password_reset_retires_earlier_tokens(api):
+    me = api("GET", "/api/auth/me")
+    email, old = me.json()["email"], me.request.headers["Authorization"]
+    assert api("POST", "/api/auth/reset-password", json={"email": email, "new_password": "Nouveau123!"}).status_code == 200
+
+    assert api("GET", "/api/auth/me", headers={"Authorization": old}).status_code == 401
+    token = api("POST", "/api/auth/login", json={"email": email, "password": "Nouveau123!"}).json()["token"]
+    assert api("GET", "/api/auth/me", headers=bearer(token)).status_code == 200
+
+
+def test_newer_token_reloads_the_cached_user(server, loop, api):
+    # Another worker reset the password: this process still caches version 0
+    me = api("GET", "/api/auth/me")
+    user, old = me.json(), me.request.headers["Authorization"]
+    loop.run_until_complete(server.db.users.update_one({"id": user["id"]}, {"$inc": {"token_version": 1}}))
+    assert server.user_cache.get(user["id"]).get("token_version", 0) == 0
+
+    assert api("GET", "/api/auth/me", headers=bearer(server.create_token(user["id"], 1))).status_code == 200
+    assert server.user_cache.get(user["id"])["token_version"] == 1
+    assert api("GET", "/api/auth/me", headers={"Authorization": old}).status_code == 401
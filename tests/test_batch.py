@@ -0,0 +1,35 @@
+def test_failed_item_does_not_fail_the_batch(server, api, answers, monkeypatch):
+    original = server.generation_cache.set
+
+    async def flaky_set(key, value, meta=None):
+        if meta["subject"] == "svt":
+            raise RuntimeError("write failed")
+        await original(key, value, meta=meta)
+
+    monkeypatch.setattr(server.generation_cache, "set", flaky_set)
+    response = api("POST", "/api/generate/batch", json={
+        "prompt": "La cellule", "subjects": ["maths", "svt"], "revision_types": ["fiche"], "subject": "maths"
+    })
+    assert response.status_code == 200
+    results = {item["subject"]: item for item in response.json()["results"]}
+    assert results["maths"]["revision"]["content"].startswith("# Fiche")
+    assert "write failed" in results["svt"]["error"]
+
+
+def test_rate_limited_batch_skips_image_processing(server, api, monkeypatch):
+    processed = []
+
+    async def refuse(key, scope, cost):
+        raise server.RateLimited(retry_after=3)
+
+    async def process_image(data):
+        processed.append(data)
+
+    monkeypatch.setattr(server.admission, "check", refuse)
+    monkeypatch.setattr(server, "process_image", process_image)
+    response = api("POST", "/api/generate/batch", json={
+        "prompt": "La cellule", "subject": "svt", "revision_types": ["fiche", "qcm"], "image_base64": "aW1hZ2U="
+    })
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+    assert processed == []
@@ -0,0 +1,49 @@
+def revision(i, **overrides):
+    return {"prompt": f"Chapitre {i}", "subject": "maths", "revision_type": "fiche",
+            "content": f"# Fiche {i % 3}\n\n- point clé", **overrides}
+
+
+def test_bulk_import_reports_each_item(api):
+    response = api("POST", "/api/revisions/bulk", json={"revisions": [
+        revision(1), {"prompt": "sans contenu"}, revision(2, created_at="2024-05-01T10:00:00Z"),
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == 2
+    assert [bool(r["id"]) for r in body["results"]] == [True, False, True]
+    assert body["results"][1]["error"].startswith("subject")
+
+    listed = api("GET", "/api/revisions").json()["items"]
+    assert [r["prompt"] for r in listed] == ["Chapitre 1", "Chapitre 2"]
+    assert listed[1]["created_at"].startswith("2024-05-01T10:00:00")
+    saved = api("GET", f"/api/revisions/{body['results'][2]['id']}").json()
+    assert saved["content"] == revision(2)["content"]
+
+
+def test_bulk_delete(api):
+    ids = [r["id"] for r in api("POST", "/api/revisions/bulk", json={
+        "revisions": [revision(i) for i in range(5)]
+    }).json()["results"]]
+
+    response = api("POST", "/api/revisions/bulk-delete", json={"ids": ids[:3] + ["inconnu"]})
+    assert response.json() == {"deleted": 3, "not_found": ["inconnu"]}
+    assert len(api("GET", "/api/revisions").json()["items"]) == 2
+    # Blobs still referenced by the remaining revisions are kept
+    remaining = api("GET", f"/api/revisions/{ids[3]}").json()
+    assert remaining["content"] == revision(3)["content"]
+
+
+def test_failed_bulk_delete_leaves_revisions_deletable(server, api, monkeypatch):
+    revision_id = api("POST", "/api/revisions/bulk", json={"revisions": [revision(1)]}).json()["results"][0]["id"]
+
+    async def failing_delete(*args, **kwargs):
+        raise RuntimeError("connection lost")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(type(server.db.revisions), "delete_many", failing_delete)
+        try:
+            api("POST", "/api/revisions/bulk-delete", json={"ids": [revision_id]})
+        except RuntimeError:
+            pass
+
+    assert api("DELETE", f"/api/revisions/{revision_id}").status_code == 200
@@ -0,0 +1,29 @@
+import hashlib
+import time
+
+from cache import TTLCache, generation_key
+from catalog import PROMPT_TEMPLATES, template_digest
+
+
+def test_generation_key_normalizes_prompt():
+    key = generation_key("maths", "qcm", "  Le   Théorème ", None, "openai/gpt", template_digest("qcm"))
+    assert key == generation_key("maths", "qcm", "le théorème", None, "openai/gpt", template_digest("qcm"))
+
+
+def test_generation_key_changes_with_template():
+    edited = hashlib.sha256((PROMPT_TEMPLATES["qcm"] + " Sois bref.").encode()).hexdigest()[:16]
+    before = generation_key("maths", "qcm", "fractions", None, "openai/gpt", template_digest("qcm"))
+    assert before != generation_key("maths", "qcm", "fractions", None, "openai/gpt", edited)
+    assert len({template_digest(t) for t in PROMPT_TEMPLATES}) == len(PROMPT_TEMPLATES)
+    # Unknown types are generated with the fiche template
+    assert template_digest("inconnu") == template_digest("fiche")
+
+
+def test_ttl_cache_expires_and_evicts():
+    cache = TTLCache(maxsize=2, ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.get("a") is None and cache.get("c") == 3
+    time.sleep(0.06)
+    assert cache.get("c") is None
@@ -0,0 +1,43 @@
+import asyncio
+import random
+
+from mongomock_motor import AsyncMongoMockClient
+
+from blobs import BlobStore
+from compression import ContentCodec
+
+
+def samples(count=200, seed=1):
+    rng = random.Random(seed)
+    words = ["théorème", "Pythagore", "triangle", "RECTO", "VERSO", "Réponse", "fraction", "équation"]
+    return [
+        f"## ❓ Question {i}\n\n" + "\n".join(f"{letter}) {' '.join(rng.choices(words, k=4))}" for letter in "ABCD")
+        + f"\n\n✅ Réponse : {rng.choice('ABCD')}"
+        for i in range(count)
+    ]
+
+
+def test_round_trip_with_dictionary():
+    async def scenario():
+        codec = ContentCodec(AsyncMongoMockClient()["test"].compression_dicts)
+        dict_id = await codec.train("qcm", samples())
+        content = samples(1, seed=9)[0]
+        data, used = codec.compress(content, "qcm")
+        assert used == dict_id
+        assert codec.decompress(data, used) == content
+    asyncio.run(scenario())
+
+
+def test_dictionary_trained_after_load_is_fetched():
+    async def scenario():
+        db = AsyncMongoMockClient()["test"]
+        old_worker = ContentCodec(db.compression_dicts)
+        await old_worker.load()
+        new_worker = ContentCodec(db.compression_dicts)
+        await new_worker.train("qcm", samples())
+
+        content = samples(1, seed=9)[0]
+        digest = await BlobStore(db.revision_blobs, new_worker).put(content, "qcm")
+        loaded = await BlobStore(db.revision_blobs, old_worker).get_many([digest])
+        assert loaded == {digest: content}
+    asyncio.run(scenario())
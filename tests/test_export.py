@@ -0,0 +1,20 @@
+import io
+import zipfile
+
+from export import ZipExport, file_name
+
+
+def test_file_name_slugs_the_subject():
+    taken = set()
+    revision = {"subject": "../../etc/Histoire Géo", "prompt": "La Révolution", "created_at": "2024-05-02T10:00:00"}
+    assert file_name(revision, taken) == "etc-histoire-geo/2024-05-02-la-revolution.md"
+    assert file_name(revision, taken) == "etc-histoire-geo/2024-05-02-la-revolution-2.md"
+    assert file_name({"subject": "/", "prompt": ""}, taken) == "autre/-revision.md"
+
+
+def test_zip_entries_stay_inside_the_archive():
+    export = ZipExport()
+    data = export.add([{"subject": "/tmp/x", "prompt": "..", "created_at": "2024-01-01", "content": "# Fiche", "cursor": "c"}])
+    data += export.close()
+    names = zipfile.ZipFile(io.BytesIO(data)).namelist()
+    assert names == ["tmp-x/2024-01-01-revision.md"]
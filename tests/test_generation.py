@@ -0,0 +1,81 @@
+import base64
+import io
+import uuid
+from types import SimpleNamespace
+
+from PIL import Image
+
+
+def generate(api, prompt, revision_type="fiche"):
+    response = api("POST", "/api/generate", json={"prompt": prompt, "subject": "svt", "revision_type": revision_type})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_near_duplicate_prompt_reuses_generation(api, answers):
+    topic = uuid.uuid4().hex[:8]
+    first = generate(api, f"La cellule et le noyau {topic}")
+    answers[None] = (0, "# Autre réponse")
+    second = generate(api, f"La cellule et le noyau {topic} !")
+    assert second["content"] == first["content"]
+    assert second["similarity"] is not None
+
+
+def test_template_change_retires_similar_matches(server, api, answers, monkeypatch):
+    prompt = f"Les volcans {uuid.uuid4().hex[:8]}"
+    old = generate(api, prompt)
+    monkeypatch.setattr(server, "template_digest", lambda revision_type: "nouveau-modele")
+    answers[None] = (0, "# Réponse du nouveau modèle")
+    fresh = generate(api, prompt)
+    assert fresh["content"] != old["content"]
+    assert fresh["similarity"] is None
+
+
+def test_stream_reports_unexpected_errors_as_events(server, api, answers, monkeypatch):
+    async def failing_set(key, value, meta=None):
+        raise RuntimeError("write failed")
+
+    monkeypatch.setattr(server.generation_cache, "set", failing_set)
+    response = api("POST", "/api/generate/stream", json={
+        "prompt": f"Les plaques tectoniques {uuid.uuid4().hex[:8]}", "subject": "svt", "revision_type": "fiche"
+    })
+    assert response.status_code == 200
+    events = [block.split("\n")[0] for block in response.text.split("\n\n") if block.startswith("event:")]
+    assert events == ["event: start", "event: error"]
+    assert "write failed" in response.text
+
+
+def test_resent_image_skips_preprocessing(server, api, answers, monkeypatch):
+    buffer = io.BytesIO()
+    Image.new("RGB", (1600, 800), (20, 90, 160)).save(buffer, "PNG")
+    image = base64.b64encode(buffer.getvalue()).decode()
+    processed = []
+    process_image = server.process_image
+
+    async def counting_process_image(data):
+        processed.append(data)
+        return await process_image(data)
+
+    monkeypatch.setattr(server, "process_image", counting_process_image)
+    body = {"prompt": f"Ce schéma {uuid.uuid4().hex[:8]}", "subject": "svt", "revision_type": "fiche", "image_base64": image}
+    first = api("POST", "/api/generate", json=body).json()
+    answers[None] = (0, "# Autre réponse")
+    second = api("POST", "/api/generate", json=body).json()
+    assert second["content"] == first["content"]
+    assert len(processed) == 1
+
+
+def test_fallback_answer_is_not_cached_for_the_image(server, loop, api, monkeypatch):
+    body = {"prompt": f"Ce schéma {uuid.uuid4().hex[:8]}", "subject": "svt", "revision_type": "fiche", "image_base64": "aW1hZ2U="}
+    raw_key = server.generation_cache_key(server.RevisionRequest(**body))
+
+    async def process_image(data):
+        return SimpleNamespace(image_base64="bm9ybWFsaXPDqWU=")
+
+    async def fallback(request, cache_key):
+        return "# Réponse de secours", False
+
+    monkeypatch.setattr(server, "process_image", process_image)
+    monkeypatch.setattr(server, "call_llm", fallback)
+    assert api("POST", "/api/generate", json=body).json()["content"] == "# Réponse de secours"
+    assert loop.run_until_complete(server.generation_cache.get(raw_key)) is None
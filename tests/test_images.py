@@ -0,0 +1,29 @@
+import asyncio
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+from images import ImagePipeline, InvalidImage
+
+
+def png(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_pipeline_resizes_on_worker_processes():
+    async def scenario():
+        pipeline = ImagePipeline(workers=1, max_edge=400)
+        try:
+            await pipeline.warm_up()
+            processed = await pipeline.process(png(1200, 600))
+            image = Image.open(io.BytesIO(base64.b64decode(processed.image_base64)))
+            assert max(image.size) == 400
+            with pytest.raises(InvalidImage):
+                await pipeline.process(b"pas une image")
+        finally:
+            pipeline.shutdown()
+    asyncio.run(scenario())
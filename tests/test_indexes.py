@@ -0,0 +1,42 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from indexes import ensure_indexes
+
+
+def test_duplicate_emails_do_not_block_other_indexes():
+    async def scenario():
+        db = AsyncMongoMockClient()["test"]
+        await db.users.insert_many([{"id": "1", "email": "a@example.com"}, {"id": "2", "email": "a@example.com"}])
+        errors = await ensure_indexes(db)
+        assert list(errors) == ["users"]
+        names = {index["name"] async for index in db.revisions.list_indexes()}
+        assert "user_id_created_at_id" in names
+    asyncio.run(scenario())
+
+
+def test_register_refuses_existing_email(api):
+    email = api("GET", "/api/auth/me").json()["email"]
+    response = api("POST", "/api/auth/register", json={"email": email, "password": "Autre123!", "name": "Bis"})
+    assert response.status_code == 400
+
+
+def test_register_skips_the_email_lookup_when_the_index_is_built(server, api, monkeypatch):
+    lookups = []
+    find_one = type(server.db.users).find_one
+
+    def counting_find_one(self, *args, **kwargs):
+        if self.name == "users" and "email" in (args[0] if args else {}):
+            lookups.append(args[0])
+        return find_one(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(server.db.users), "find_one", counting_find_one)
+    email = api("GET", "/api/auth/me").json()["email"]
+    body = {"email": email, "password": "Autre123!", "name": "Bis"}
+    assert api("POST", "/api/auth/register", json=body).status_code == 400
+    assert lookups == []
+
+    monkeypatch.setattr(server.app.state, "index_errors", {"users": "E11000 duplicate key"})
+    assert api("POST", "/api/auth/register", json=body).status_code == 400
+    assert lookups == [{"email": email}]
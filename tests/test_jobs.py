@@ -0,0 +1,44 @@
+import asyncio
+import uuid
+
+from jobs import DONE, QUEUED, MemoryJobBackend
+
+
+def make_job(priority=0):
+    return {"id": str(uuid.uuid4()), "status": QUEUED, "priority": priority, "payload": {}}
+
+
+def test_queued_job_outlives_result_ttl():
+    async def scenario():
+        backend = MemoryJobBackend(result_ttl=0.05)
+        job = make_job()
+        await backend.submit(job)
+        await asyncio.sleep(0.1)
+        assert (await backend.get(job["id"]))["status"] == QUEUED
+        assert (await backend.claim(timeout=0.1))["id"] == job["id"]
+    asyncio.run(scenario())
+
+
+def test_result_ttl_starts_at_finish():
+    async def scenario():
+        backend = MemoryJobBackend(result_ttl=0.1)
+        job = make_job()
+        await backend.submit(job)
+        await backend.claim(timeout=0.1)
+        await asyncio.sleep(0.15)
+        await backend.finish(job["id"], DONE, result={"ok": True})
+        assert (await backend.get(job["id"]))["result"] == {"ok": True}
+        await asyncio.sleep(0.15)
+        assert await backend.get(job["id"]) is None
+    asyncio.run(scenario())
+
+
+def test_claim_follows_priority():
+    async def scenario():
+        backend = MemoryJobBackend()
+        low, high = make_job(priority=5), make_job(priority=0)
+        await backend.submit(low)
+        await backend.submit(high)
+        assert (await backend.claim(timeout=0.1))["id"] == high["id"]
+        assert (await backend.depth()) == 1
+    asyncio.run(scenario())
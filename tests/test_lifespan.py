@@ -0,0 +1,46 @@
+import asyncio
+
+import httpx
+
+
+def test_starts_without_mongo_and_becomes_ready(server, loop, answers, monkeypatch):
+    attempts = []
+    create_indexes = server.create_indexes
+
+    async def flaky_create_indexes():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("No servers found yet")
+        await create_indexes()
+
+    async def ping(timeout=2):
+        return len(attempts) > 1
+
+    monkeypatch.setattr(server, "create_indexes", flaky_create_indexes)
+    monkeypatch.setattr(server, "ping_mongo", ping)
+    # The other tests share these
+    for shared in (server.image_pipeline, server.password_hasher):
+        monkeypatch.setattr(shared, "shutdown", lambda: None)
+    monkeypatch.setattr(server.client, "close", lambda: None)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with server.app.router.lifespan_context(server.app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                assert (await client.get("/api/health/live")).status_code == 200
+                assert (await client.get("/api/health/ready")).status_code == 503
+                for _ in range(100):
+                    if server.app.state.ready:
+                        break
+                    await asyncio.sleep(0.05)
+                ready = await client.get("/api/health/ready")
+                assert ready.status_code == 200
+                assert isinstance(ready.json()["warm_up"]["database"], float)
+        assert len(attempts) == 2
+
+    index_errors = server.app.state.index_errors
+    try:
+        loop.run_until_complete(scenario())
+    finally:
+        server.app.state.ready = True
+        server.app.state.index_errors = index_errors
@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+from llm import LlmGateway, LlmUnavailable, ModelRoute
+
+PRIMARY = ModelRoute("openai", "primary")
+FALLBACK = ModelRoute("openai", "fallback")
+
+
+def test_primary_answer_reports_primary_route(answers):
+    answers.update(primary=(0, "A"), fallback=(0, "B"))
+    gateway = LlmGateway("key", [PRIMARY, FALLBACK])
+    completion = asyncio.run(gateway.complete("system", "message"))
+    assert completion == ("A", PRIMARY)
+
+
+def test_fallback_answer_reports_fallback_route(answers):
+    answers.update(primary=(0, RuntimeError("down")), fallback=(0, "B"))
+    gateway = LlmGateway("key", [PRIMARY, FALLBACK])
+    completion = asyncio.run(gateway.complete("system", "message"))
+    assert completion.route == FALLBACK
+    assert gateway.fallbacks == 1
+
+
+def test_hedge_wins_when_primary_is_slow(answers):
+    answers.update(primary=(1, "A"), fallback=(0, "B"))
+    gateway = LlmGateway("key", [PRIMARY, FALLBACK], hedge_after=0.05)
+    completion = asyncio.run(gateway.complete("system", "message"))
+    assert completion == ("B", FALLBACK)
+    assert gateway.hedges == 1
+
+
+def test_every_route_failing_raises(answers):
+    answers.update(primary=(0, RuntimeError("down")), fallback=(0, RuntimeError("down too")))
+    with pytest.raises(LlmUnavailable):
+        asyncio.run(LlmGateway("key", [PRIMARY, FALLBACK]).complete("system", "message"))
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from ratelimit import AdmissionControl, BucketRule, FairQueue, MemoryBucketBackend, RateLimited, refill
+
+
+def test_refill_is_capped_at_burst():
+    rule = BucketRule(rate=2, burst=10)
+    assert refill(4, updated=100, now=101, rule=rule) == 6
+    assert refill(4, updated=100, now=200, rule=rule) == 10
+
+
+def test_bucket_allows_burst_then_reports_wait():
+    async def scenario():
+        backend = MemoryBucketBackend()
+        rule = BucketRule(rate=1, burst=3)
+        assert [await backend.take("ip:1", 1, rule) for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert await backend.take("ip:1", 1, rule) == pytest.approx(1, abs=0.05)
+        # Other callers have their own bucket
+        assert await backend.take("ip:2", 1, rule) == 0.0
+    asyncio.run(scenario())
+
+
+def test_admission_raises_with_retry_after():
+    async def scenario():
+        admission = AdmissionControl(MemoryBucketBackend(), {"llm": BucketRule(rate=0.5, burst=4)})
+        await admission.check("user:a", "llm", cost=4)
+        with pytest.raises(RateLimited) as raised:
+            await admission.check("user:a", "llm", cost=2)
+        assert raised.value.retry_after == pytest.approx(4, abs=0.1)
+        assert admission.rejected == 1
+    asyncio.run(scenario())
+
+
+def test_memory_backend_evicts_least_recently_used():
+    async def scenario():
+        backend = MemoryBucketBackend(maxsize=2)
+        rule = BucketRule(rate=0.001, burst=1)
+        for key in ("a", "b", "c"):
+            await backend.take(key, 1, rule)
+        # "a" was evicted: its bucket starts full again
+        assert await backend.take("a", 1, rule) == 0.0
+        assert await backend.take("c", 1, rule) > 0
+    asyncio.run(scenario())
+
+
+def test_fair_queue_interleaves_callers():
+    async def scenario():
+        queue, order = FairQueue(slots=1), []
+        gate = asyncio.Event()
+
+        async def request(key, label):
+            async with queue.turn(key):
+                order.append(label)
+                await gate.wait()
+
+        holder = asyncio.create_task(request("heavy", "heavy-0"))
+        await asyncio.sleep(0)
+        heavy = [asyncio.create_task(request("heavy", f"heavy-{i}")) for i in range(1, 4)]
+        await asyncio.sleep(0)
+        light = asyncio.create_task(request("light", "light"))
+        await asyncio.sleep(0)
+        assert queue.waiting() == 4
+        gate.set()
+        await asyncio.gather(holder, *heavy, light)
+        # The single light request is served before the heavy caller's backlog
+        assert order.index("light") == 1
+        assert queue.busy == 0
+    asyncio.run(scenario())
+
+
+def test_fair_queue_survives_cancelled_waiters():
+    async def scenario():
+        queue = FairQueue(slots=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with queue.turn("a"):
+                await release.wait()
+
+        async def quick():
+            async with queue.turn("b"):
+                return "servi"
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        gone = asyncio.create_task(quick())
+        waiting = asyncio.create_task(quick())
+        await asyncio.sleep(0)
+        gone.cancel()
+        release.set()
+        await holder
+        assert await waiting == "servi"
+        assert queue.busy == 0
+    asyncio.run(scenario())
+
+
+def test_fair_queue_caps_finish_tags_while_busy():
+    async def scenario():
+        queue = FairQueue(slots=2, maxsize=100)
+        release = asyncio.Event()
+
+        async def hold():
+            async with queue.turn("long"):
+                await release.wait()
+
+        async def quick(key):
+            async with queue.turn(key):
+                await asyncio.sleep(0)
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        # The queue never goes idle, so only the cap bounds the finish tags
+        await asyncio.gather(*[quick(f"user-{i}") for i in range(1000)])
+        assert len(queue._finish) == 100
+        release.set()
+        await holder
+        assert queue.busy == 0
+    asyncio.run(scenario())
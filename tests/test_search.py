@@ -0,0 +1,59 @@
+from search import TITLE_WEIGHT, combine, content_fields, query_terms, rank, title_fields
+
+
+def test_query_terms_fold_accents_and_plurals():
+    assert query_terms("Les Théorèmes de Pythagore") == ["theoreme", "pythagore"]
+
+
+def test_combine_adds_content_and_title_statistics():
+    revision = title_fields("Théorème de Pythagore", "maths")
+    revision["content_hash"] = "h"
+    combined = combine(revision, content_fields("Le théorème s'applique au triangle rectangle."))
+    assert combined["search_tf"]["theoreme"] == TITLE_WEIGHT + 1
+    assert combined["search_tf"]["triangle"] == 1
+    assert "content_hash" not in combined and "search_v" not in combined
+
+
+def test_rank_prefers_title_matches():
+    docs = [
+        {"id": "content", "created_at": "2", **combine(title_fields("Révisions", "svt"), content_fields("la cellule"))},
+        {"id": "title", "created_at": "1", **combine(title_fields("La cellule", "svt"), content_fields("ADN"))},
+    ]
+    ranked = rank(docs, query_terms("cellule"), total=10)
+    assert [doc["id"] for _, doc in ranked] == ["title", "content"]
+
+
+def save(api, prompt, content):
+    return api("POST", "/api/revisions", json={
+        "prompt": prompt, "subject": "maths", "revision_type": "fiche", "content": content
+    }).json()["id"]
+
+
+def test_search_endpoint_matches_content_and_prompt(server, loop, api):
+    by_content = save(api, "Chapitre 3", "## Le théorème de Pythagore\n\n- triangle rectangle")
+    by_prompt = save(api, "Pythagore exercices", "- calculer une longueur")
+    save(api, "Fractions", "- numérateur et dénominateur")
+
+    found = api("GET", "/api/revisions/search", params={"q": "pythagore"}).json()
+    assert {item["id"] for item in found["items"]} == {by_content, by_prompt}
+    assert api("GET", "/api/revisions/search", params={"q": "triangle"}).json()["items"][0]["id"] == by_content
+
+    stored = loop.run_until_complete(server.db.revisions.find_one({"id": by_content}))
+    assert "triangle" not in stored["search_tf"]
+    blob = loop.run_until_complete(server.db.revision_blobs.find_one({"_id": stored["content_hash"]}))
+    assert blob["search_tf"]["triangle"] == 1
+
+
+def test_search_flags_a_capped_count(server, api, monkeypatch):
+    for n in range(3):
+        save(api, f"Chapitre {n}", "- la photosynthèse")
+    found = api("GET", "/api/revisions/search", params={"q": "photosynthese"}).json()
+    assert (found["total"], found["total_capped"]) == (3, False)
+
+    monkeypatch.setattr(server, "SEARCH_MAX_CANDIDATES", 2)
+    found = api("GET", "/api/revisions/search", params={"q": "photosynthese"}).json()
+    assert (found["total"], found["total_capped"]) == (2, True)
+
+    monkeypatch.setattr(server, "SEARCH_MAX_CANDIDATES", 10)
+    monkeypatch.setattr(server, "SEARCH_MAX_BLOBS", 0)
+    assert api("GET", "/api/revisions/search", params={"q": "photosynthese"}).json()["total_capped"]
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_task():
+    async def scenario():
+        flight, calls = SingleFlight(), []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "résultat"
+
+        results = await asyncio.gather(*[flight.do("k", work) for _ in range(5)])
+        assert results == ["résultat"] * 5
+        assert len(calls) == 1
+        assert flight.in_flight() == 0
+    asyncio.run(scenario())
+
+
+def test_errors_reach_every_caller_and_are_not_kept():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        with pytest.raises(ValueError):
+            await flight.do("k", fail)
+    asyncio.run(scenario())
+
+
+def test_cancelling_one_caller_keeps_the_task_for_others():
+    async def scenario():
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def work():
+            started.set()
+            await asyncio.sleep(0.05)
+            return 42
+
+        first = asyncio.create_task(flight.do("k", work))
+        second = asyncio.create_task(flight.do("k", work))
+        await started.wait()
+        first.cancel()
+        assert await second == 42
+    asyncio.run(scenario())
+
+
+def test_last_caller_leaving_cancels_the_task():
+    async def scenario():
+        flight = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        caller = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+    asyncio.run(scenario())
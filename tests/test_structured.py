@@ -0,0 +1,125 @@
+from structured import grade, parse_flashcards, parse_qcm, parse_revision, parse_trous, public_view
+
+QCM = """# 📝 QCM : Le théorème de Pythagore
+
+**Question 1 :** Dans quel triangle s'applique le théorème ?
+A) Un triangle isocèle
+B) Un triangle rectangle
+C) Un triangle équilatéral
+D) N'importe quel triangle
+**Réponse : B**
+Explication : il relie les côtés d'un triangle rectangle.
+
+---
+
+**Question 2 :** Comment s'appelle le plus grand côté ?
+- A) La médiane
+- B) La hauteur
+- C) L'hypoténuse ✅
+- D) La base
+"""
+
+QCM_WITH_KEY = """## Questions
+
+1. Combien font 3² + 4² ?
+A) 7
+B) 25
+C) 49
+
+2. Quelle est alors la longueur de l'hypoténuse ?
+A) 5
+B) 7
+C) 25
+
+## ✅ Corrigé
+1 - B
+2 - A
+"""
+
+FLASHCARDS = """# 🃏 Flashcards
+
+**Carte 1**
+RECTO : Qu'est-ce qu'une cellule ?
+VERSO : L'unité de base du vivant.
+
+---
+
+**Carte 2**
+**RECTO :** Où se trouve l'ADN ?
+**VERSO :** Dans le noyau
+de la cellule.
+"""
+
+TROUS = """# ✏️ Texte à trous
+
+La _____ est l'unité de base du vivant. Son information génétique est portée par l'_____.
+
+## Mots à placer
+ADN / cellule
+
+## Réponses
+1. cellule
+2. ADN
+"""
+
+
+def test_qcm_inline_answers_and_correct_marks():
+    parsed = parse_qcm(QCM)
+    assert [q["answer"] for q in parsed["questions"]] == [1, 2]
+    assert parsed["questions"][0]["choices"][1] == "Un triangle rectangle"
+    assert parsed["questions"][0]["explanation"].startswith("il relie")
+    assert parsed["questions"][1]["choices"][2] == "L'hypoténuse"
+
+
+def test_qcm_answer_key_section():
+    parsed = parse_qcm(QCM_WITH_KEY)
+    assert [q["question"] for q in parsed["questions"]] == [
+        "Combien font 3² + 4² ?", "Quelle est alors la longueur de l'hypoténuse ?"
+    ]
+    assert [q["answer"] for q in parsed["questions"]] == [1, 0]
+
+
+def test_qcm_rejects_other_content():
+    assert parse_qcm("# Fiche\n\n- une notion\n- une autre") is None
+
+
+def test_flashcards_recto_verso():
+    cards = parse_flashcards(FLASHCARDS)["cards"]
+    assert cards == [
+        {"front": "Qu'est-ce qu'une cellule ?", "back": "L'unité de base du vivant."},
+        {"front": "Où se trouve l'ADN ?", "back": "Dans le noyau\nde la cellule."},
+    ]
+
+
+def test_flashcards_without_labels_use_blocks():
+    cards = parse_flashcards("Mitose\nDivision cellulaire\n\n---\n\nMéiose\nFormation des gamètes")["cards"]
+    assert [card["front"] for card in cards] == ["Mitose", "Méiose"]
+
+
+def test_trous_numbers_gaps_and_reads_answers():
+    parsed = parse_trous(TROUS)
+    assert parsed["text"].count("{1}") == 1 and "{2}" in parsed["text"]
+    assert parsed["word_bank"] == ["ADN", "cellule"]
+    assert parsed["answers"] == ["cellule", "ADN"]
+
+
+def test_parse_revision_ignores_unparsed_types():
+    assert parse_revision("fiche", QCM) is None
+    assert parse_revision("qcm", QCM)["kind"] == "qcm"
+
+
+def test_public_view_hides_answers():
+    view = public_view(parse_qcm(QCM))
+    assert "answer" not in view["questions"][0]
+    assert "answers" not in public_view(parse_trous(TROUS))
+
+
+def test_grade_qcm_by_letter():
+    result = grade(parse_qcm(QCM), {0: "b", 1: "A"})
+    assert result["score"] == 1 and result["total"] == 2
+    assert result["results"][1]["expected"] == "C"
+
+
+def test_grade_trous_ignores_case_and_accents():
+    result = grade(parse_trous(TROUS), {0: "Cellule", 1: "adn."})
+    assert result["score"] == 2
@@ -0,0 +1,50 @@
+import io
+import uuid
+
+from PIL import Image
+
+
+def test_chunked_upload_over_the_cap_is_refused(server, api):
+    oversized = b"x" * (server.MAX_UPLOAD_BYTES + 2 * server.UPLOAD_CHUNK_SIZE)
+
+    def chunks():
+        for start in range(0, len(oversized), server.UPLOAD_CHUNK_SIZE):
+            yield oversized[start:start + server.UPLOAD_CHUNK_SIZE]
+
+    boundary = "limite"
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"image\"; filename=\"cours.jpg\"\r\n"
+            "Content-Type: image/jpeg\r\n\r\n").encode()
+
+    async def body():
+        yield head
+        for chunk in chunks():
+            yield chunk
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    response = api("POST", "/api/generate/upload", content=body(),
+                   headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+    assert response.status_code == 413
+    assert response.json()["detail"] == "Image trop volumineuse"
+
+
+def test_declared_length_over_the_cap_is_refused(server, api):
+    response = api("POST", "/api/generate/upload", content=b"x" * (server.MAX_UPLOAD_BYTES + 2 * server.UPLOAD_CHUNK_SIZE),
+                   headers={"Content-Type": "multipart/form-data; boundary=limite"})
+    assert response.status_code == 413
+
+
+def test_upload_under_the_cap_reaches_the_endpoint(api, answers):
+    response = api("POST", "/api/generate/upload", files={"image": ("cours.jpg", b"pas une image", "image/jpeg")},
+                   data={"prompt": "La cellule", "subject": "svt", "revision_type": "fiche"})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Image invalide")
+
+
+def test_small_image_upload_is_generated(api, answers):
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (30, 120, 60)).save(buffer, "JPEG")
+    answers[None] = (0, "# Fiche\n\n- la mitose")
+    response = api("POST", "/api/generate/upload", files={"image": ("cours.jpg", buffer.getvalue(), "image/jpeg")},
+                   data={"prompt": f"La mitose {uuid.uuid4().hex[:8]}", "subject": "svt", "revision_type": "fiche"})
+    assert response.status_code == 200
+    assert response.json()["content"] == "# Fiche\n\n- la mitose"